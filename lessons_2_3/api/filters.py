@@ -0,0 +1,75 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import filters
+
+DATE_PATTERNS = (
+    re.compile(r'^(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})$'),
+    re.compile(r'^(?P<day>\d{1,2})\.(?P<month>\d{1,2})\.(?P<year>\d{4})$'),
+    re.compile(r'^(?P<year>\d{4})-(?P<month>\d{1,2})$'),
+    re.compile(r'^(?P<month>\d{1,2})\.(?P<year>\d{4})$'),
+    re.compile(r'^(?P<year>\d{4})$'),
+)
+
+
+def parse_date_range(term):
+    """Диапазон [начало, конец) для терма вида даты, месяца или года."""
+    for pattern in DATE_PATTERNS:
+        match = pattern.match(term)
+        if match is None:
+            continue
+        parts = {key: int(value) for key, value in match.groupdict().items()}
+        try:
+            start = date(
+                parts['year'], parts.get('month', 1), parts.get('day', 1)
+            )
+            if 'day' in parts:
+                end = start + timedelta(days=1)
+            elif 'month' in parts:
+                end = (start + timedelta(days=31)).replace(day=1)
+            else:
+                end = start.replace(year=start.year + 1)
+        except (ValueError, OverflowError):
+            return None
+        return tuple(
+            timezone.make_aware(datetime.combine(day, time.min))
+            for day in (start, end)
+        )
+    return None
+
+
+class PostSearchFilter(filters.SearchFilter):
+    """Поиск с использованием индексов.
+
+    Текстовые поля из search_fields ищутся через ILIKE, который обслуживают
+    trigram-индексы. Термы, похожие на дату, дополнительно превращаются в
+    диапазон по полям search_date_fields вместо приведения даты к тексту.
+    Порядок выборки не меняется, поэтому OrderingFilter работает как прежде.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request) or ()
+        date_fields = getattr(view, 'search_date_fields', ())
+        search_terms = self.get_search_terms(request)
+        if not search_terms or not (search_fields or date_fields):
+            return queryset
+
+        lookups = [
+            self.construct_search(str(field)) for field in search_fields
+        ]
+        for term in search_terms:
+            conditions = [Q(**{lookup: term}) for lookup in lookups]
+            date_range = parse_date_range(term)
+            if date_range is not None:
+                start, end = date_range
+                conditions += [
+                    Q(**{f'{field}__gte': start, f'{field}__lt': end})
+                    for field in date_fields
+                ]
+            if conditions:
+                queryset = queryset.filter(reduce(or_, conditions))
+        return queryset
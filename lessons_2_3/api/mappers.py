@@ -0,0 +1,179 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from blog.likes import pending_likes
+from blog.models import Comment, ImageRendition, Images, Post
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import OuterRef, Subquery
+from rest_framework import serializers
+from taggit.models import TaggedItem
+
+User = get_user_model()
+
+to_datetime = serializers.DateTimeField().to_representation
+
+
+def column(name, convert=None):
+    """Поле ответа из одной колонки строки .values()."""
+    get = itemgetter(name)
+    if convert is None:
+        return (name,), get
+    return (name,), lambda row: convert(get(row))
+
+
+def nested(prefix, names):
+    """Вложенный объект из колонок связанной модели prefix__name."""
+    columns = tuple(f'{prefix}__{name}' for name in names)
+    pairs = tuple(zip(names, columns))
+    return columns, lambda row: {name: row[key] for name, key in pairs}
+
+
+def total_likes(model):
+    """Счётчик лайков с учётом буфера, как у свойства total_likes."""
+
+    def get(row):
+        if settings.LIKE_BUFFER:
+            return row['likes_count'] + pending_likes(model(id=row['id']))
+        return row['likes_count']
+
+    return ('id', 'likes_count'), get
+
+
+def load_tags(ids):
+    """Имена тегов постов одним запросом, по имени, как у Post.tags."""
+    items = (
+        TaggedItem.objects.filter(
+            content_type=ContentType.objects.get_for_model(Post),
+            object_id__in=ids,
+        )
+        .order_by('tag__name')
+        .values_list('object_id', 'tag__name')
+    )
+    tags = defaultdict(list)
+    for post_id, name in items:
+        tags[post_id].append(name)
+    return tags
+
+
+def load_images(ids):
+    """Изображения постов в форме ImagesSerializer одним запросом."""
+    storage = Images._meta.get_field('image').storage
+    rendition = ImageRendition.objects.filter(
+        image=OuterRef('id'), variant='original'
+    ).values('file')[:1]
+    rows = (
+        Images.objects.filter(post_id__in=ids)
+        .annotate(rendition=Subquery(rendition))
+        .order_by('id')
+        .values_list('id', 'post_id', 'image', 'rendition')
+    )
+    images = defaultdict(list)
+    for image_id, post_id, image, rendition in rows:
+        images[post_id].append(
+            {
+                'id': image_id,
+                'url': storage.url(rendition or image),
+                'srcset': Images(id=image_id).srcset,
+            }
+        )
+    return images
+
+
+class RowMapper:
+    """Словари в форме сериалайзера из строк .values() без сериалайзера.
+
+    fields сопоставляет полю ответа в порядке полей сериалайзера кортеж
+    (колонки .values(), функция от строки); related - загрузчики данных
+    связей "ко многим" по списку id. Колонки и функции для набора полей
+    собираются один раз, а не на каждый объект, как у сериалайзера.
+    """
+
+    def __init__(self, model, fields, related=None):
+        self.model = model
+        self.fields = fields
+        self.related = related or {}
+
+    def get_names(self, names=None):
+        """Поля ответа в порядке сериалайзера."""
+        if names is None:
+            return list(self.fields)
+        return [name for name in self.fields if name in names]
+
+    def values(self, queryset, names=None, extra=()):
+        """Выборка .values() с колонками для полей names и extra."""
+        columns = {'id', *extra}
+        for name in self.get_names(names):
+            columns.update(self.fields[name][0])
+        return (
+            queryset.select_related(None)
+            .prefetch_related(None)
+            .values(*sorted(columns))
+        )
+
+    def map(self, rows, names=None):
+        """Список словарей ответа для строк выборки values()."""
+        names = self.get_names(names)
+        ids = [row['id'] for row in rows]
+        for name in names:
+            if name in self.related:
+                data = self.related[name](ids)
+                for row in rows:
+                    row[name] = data.get(row['id'], [])
+        getters = [(name, self.fields[name][1]) for name in names]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    def instance(self, row):
+        """Экземпляр модели с колонками строки для проверки прав."""
+        attnames = {
+            field.attname for field in self.model._meta.concrete_fields
+        }
+        return self.model(
+            **{key: value for key, value in row.items() if key in attnames}
+        )
+
+
+# Формы UserSerializer, CommentSerialiser и PostSerializer
+user_mapper = RowMapper(
+    User,
+    {
+        'id': column('id'),
+        'username': column('username'),
+        'email': column('email'),
+        'first_name': column('first_name'),
+        'last_name': column('last_name'),
+        'created': column('created', to_datetime),
+        'updated': column('updated', to_datetime),
+    },
+)
+
+comment_mapper = RowMapper(
+    Comment,
+    {
+        'id': column('id'),
+        'author': nested('author', ('id', 'username')),
+        'text': column('text'),
+        'created': column('created', to_datetime),
+        'updated': column('updated', to_datetime),
+        'status': column('status'),
+        'likes_count': total_likes(Comment),
+    },
+)
+
+post_mapper = RowMapper(
+    Post,
+    {
+        'id': column('id'),
+        'author': nested('author', ('id', 'username', 'email')),
+        'title': column('title'),
+        'text': column('text'),
+        'created': column('created', to_datetime),
+        'updated': column('updated', to_datetime),
+        'status': column('status'),
+        'tags': ((), itemgetter('tags')),
+        'likes_count': total_likes(Post),
+        'images': ((), itemgetter('images')),
+    },
+    related={'tags': load_tags, 'images': load_images},
+)
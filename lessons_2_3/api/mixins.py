@@ -0,0 +1,145 @@
+from django.conf import settings
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from .serializers import DynamicFieldsModelSerializer
+
+
+class SparseFieldsMixin:
+    """Выбор полей ответа параметром ?fields=id,title,author.
+
+    Лишние поля убираются из сериалайзера, а выборка ограничивается
+    колонками и связями, которые читают оставшиеся поля: sparse_fields
+    сопоставляет полю сериалайзера пути к данным модели. Путь через
+    внешний ключ добавляет select_related, путь через связь "ко многим" -
+    prefetch_related, остальные пути попадают в only(). sparse_required
+    сопоставляет действию пути, которые нужны ему самому, например для
+    валидаторов условного запроса, при любом наборе полей.
+    """
+
+    fields_query_param = 'fields'
+    sparse_fields = {}
+    sparse_required = {}
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_fields(self):
+        """Запрошенные поля или None, если выбор полей не применяется."""
+        value = self.request.query_params.get(self.fields_query_param)
+        if (
+            not value
+            or self.action not in self.sparse_actions
+            or self.request.method not in permissions.SAFE_METHODS
+            or not issubclass(
+                self.get_serializer_class(), DynamicFieldsModelSerializer
+            )
+        ):
+            return None
+        fields = [field.strip() for field in value.split(',') if field]
+        unknown = set(fields) - set(self.sparse_fields)
+        if unknown or not fields:
+            raise ValidationError(
+                {
+                    self.fields_query_param: [
+                        'Допустимые значения: '
+                        f'{", ".join(self.sparse_fields)}'
+                    ]
+                }
+            )
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        opts = queryset.model._meta
+        only, select, prefetch = set(), set(), set()
+        paths = [
+            path for field in fields for path in self.sparse_fields[field]
+        ]
+        paths.extend(self.sparse_required.get(self.action, ()))
+        for path in paths:
+            relation = opts.get_field(path.split('__')[0])
+            if relation.many_to_many or relation.one_to_many:
+                prefetch.add(path)
+                continue
+            if relation.many_to_one and '__' in path:
+                select.add(relation.name)
+            only.add(path)
+        # Поля ключа курсорной пагинации читаются у каждого объекта
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is not None:
+            ordering = get_ordering(self.request, queryset, self)
+            only.update(name.lstrip('-') for name in ordering)
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select:
+            queryset = queryset.select_related(*select)
+        return queryset.prefetch_related(*prefetch).only(*only)
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+class RowMapperMixin:
+    """Ответы на чтение без сериалайзера: строки .values() и RowMapper.
+
+    Для GET-запросов действий из mapper_actions данные той же формы, что
+    и у сериалайзера, строятся из строк выборки .values(). Выбор полей
+    SparseFieldsMixin учитывается. Отключается настройкой API_ROW_MAPPERS.
+    """
+
+    row_mapper = None
+    mapper_actions = ('list', 'retrieve')
+
+    def use_row_mapper(self):
+        return (
+            settings.API_ROW_MAPPERS
+            and self.row_mapper is not None
+            and self.action in self.mapper_actions
+            and self.request.method in permissions.SAFE_METHODS
+        )
+
+    def get_mapper_fields(self):
+        get_sparse_fields = getattr(self, 'get_sparse_fields', None)
+        return get_sparse_fields() if get_sparse_fields else None
+
+    def map_page(self, queryset, mapper=None):
+        """Ответ со страницей списка, построенной из строк .values()."""
+        mapper = mapper or self.row_mapper
+        fields = self.get_mapper_fields()
+        ordering = ()
+        get_ordering = getattr(self.paginator, 'get_ordering', None)
+        if get_ordering is not None:
+            ordering = [
+                name.lstrip('-')
+                for name in get_ordering(self.request, queryset, self)
+            ]
+        rows = mapper.values(queryset, fields, ordering)
+        page = self.paginate_queryset(rows)
+        if page is None:
+            return Response(mapper.map(list(rows), fields))
+        return self.get_paginated_response(mapper.map(page, fields))
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_row_mapper():
+            return super().list(request, *args, **kwargs)
+        return self.map_page(self.filter_queryset(self.get_queryset()))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_row_mapper():
+            return super().retrieve(request, *args, **kwargs)
+        fields = self.get_mapper_fields()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.row_mapper.values(
+                self.filter_queryset(self.get_queryset()), fields
+            ),
+            **{self.lookup_field: kwargs[lookup_url_kwarg]},
+        )
+        self.check_object_permissions(request, self.row_mapper.instance(row))
+        return Response(self.row_mapper.map([row], fields)[0])
@@ -0,0 +1,82 @@
+from blog.utils import CursorPaginator
+from django.conf import settings
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Курсорная пагинация по ключу сортировки без COUNT(*) и OFFSET.
+
+    По умолчанию ключ - (created, id). Порядок, заданный OrderingFilter
+    или атрибутом представления keyset_ordering, дополняется полем id,
+    чтобы ключ был уникальным. Поля сортировки должны быть NOT NULL.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    ordering = ('-created', '-id')
+    cursor_query_param = 'cursor'
+
+    @property
+    def max_page_size(self):
+        return settings.API_MAX_PAGE_SIZE
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """Поля ключа сортировки с id в конце."""
+        ordering = getattr(view, 'keyset_ordering', None)
+        for backend in getattr(view, 'filter_backends', ()):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+        ordering = [
+            field.replace('pk', 'id') for field in ordering or self.ordering
+        ]
+        if 'id' not in (field.lstrip('-') for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = CursorPaginator(
+            queryset,
+            self.get_page_size(request),
+            self.get_ordering(request, queryset, view),
+        )
+        self.page = paginator.page(
+            request.query_params.get(self.cursor_query_param)
+        )
+        return list(self.page)
+
+    def paginate_page(self, page, request):
+        """Использование готовой страницы CursorPage."""
+        self.request = request
+        self.page = page
+        return list(page)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                'next': self.get_link(self.page.next_cursor),
+                'previous': self.get_link(self.page.previous_cursor),
+                'results': data,
+            }
+        )
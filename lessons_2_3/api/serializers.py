@@ -1,6 +1,8 @@
-from blog.models import Comment, Post
+from blog.models import Comment, Images, Post
+from blog.tasks import run_on_commit
+from blog.utils import bulk_add_tags, publish_posts, sync_tags
+from django.conf import settings
 from django.contrib.auth import get_user_model, hashers
-from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from taggit.serializers import TaggitSerializer, TagListSerializerField
 
@@ -46,10 +48,23 @@ class UserSerializer(DynamicFieldsModelSerializer):
         return hashers.make_password(value)
 
 
+class TopAuthorSerializer(serializers.ModelSerializer):
+    """Сериалайзер топ-листа авторов."""
+
+    top_rating = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = ('id', 'username', 'rating_count', 'top_rating')
+
+
 class CommentSerialiser(DynamicFieldsModelSerializer):
     """Сериалайзер запросов к комментариям."""
 
     author = UserSerializer(required=False, fields=('id', 'username'))
+    likes_count = serializers.IntegerField(
+        source='total_likes', read_only=True
+    )
 
     class Meta:
         model = Comment
@@ -60,8 +75,45 @@ class CommentSerialiser(DynamicFieldsModelSerializer):
             'created',
             'updated',
             'status',
+            'likes_count',
+        )
+        read_only_fields = (
+            'author',
+            'created',
+            'updated',
+            'status',
+            'likes_count',
         )
-        read_only_fields = ('author', 'created', 'updated', 'status')
+
+
+class ImagesSerializer(serializers.ModelSerializer):
+    """Сериалайзер изображений поста с адресами копий для srcset."""
+
+    url = serializers.CharField(read_only=True)
+    srcset = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Images
+        fields = ('id', 'url', 'srcset')
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """Создание списка постов пачками.
+
+    Посты вставляются через bulk_create, теги всех постов разрешаются за
+    один проход, а связи с ними пишутся одной вставкой на пачку. Похожие
+    посты и ленты подписчиков обновляются в фоне после фиксации.
+    """
+
+    def create(self, validated_data):
+        tags = [attrs.pop('tags', []) for attrs in validated_data]
+        posts = Post.objects.bulk_create(
+            [Post(**attrs) for attrs in validated_data],
+            batch_size=settings.API_BULK_BATCH_SIZE,
+        )
+        bulk_add_tags(list(zip(posts, tags)), settings.API_BULK_BATCH_SIZE)
+        run_on_commit(publish_posts, [post.id for post in posts])
+        return posts
 
 
 class PostSerializer(DynamicFieldsModelSerializer, TaggitSerializer):
@@ -69,6 +121,10 @@ class PostSerializer(DynamicFieldsModelSerializer, TaggitSerializer):
 
     tags = TagListSerializerField(required=False)
     author = UserSerializer(required=False, fields=('id', 'username', 'email'))
+    images = ImagesSerializer(many=True, read_only=True)
+    likes_count = serializers.IntegerField(
+        source='total_likes', read_only=True
+    )
 
     class Meta:
         model = Post
@@ -81,26 +137,48 @@ class PostSerializer(DynamicFieldsModelSerializer, TaggitSerializer):
             'updated',
             'status',
             'tags',
+            'likes_count',
+            'images',
+        )
+        list_serializer_class = PostListSerializer
+        read_only_fields = (
+            'author',
+            'created',
+            'updated',
+            'status',
+            'likes_count',
         )
-        read_only_fields = ('author', 'created', 'updated', 'status')
 
     def create(self, validated_data):
-        try:
-            tags = validated_data.pop('tags')
-        except KeyError:
-            return super().create(validated_data)
-        obj = Post.objects.create(**validated_data)
-        for tag in tags:
-            obj.tags.add(tag)
+        tags = validated_data.pop('tags', None)
+        obj = super().create(validated_data)
+        if tags:
+            sync_tags(obj, tags)
         return obj
 
     def update(self, instance, validated_data):
-        try:
-            tags = validated_data.pop('tags')
-        except KeyError:
-            return super().update(instance, validated_data)
-        obj = get_object_or_404(Post, id=instance.id)
-        obj.tags.clear()
-        for tag in tags:
-            obj.tags.add(tag)
-        return super().update(instance, validated_data)
+        tags = validated_data.pop('tags', None)
+        instance = super().update(instance, validated_data)
+        if tags is not None:
+            sync_tags(instance, tags)
+        return instance
+
+
+class TopPostSerializer(PostSerializer):
+    """Сериалайзер топ-листа постов."""
+
+    top = serializers.IntegerField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ('top',)
+
+
+class PostExportSerializer(PostSerializer):
+    """Сериалайзер выгрузки постов вместе с комментариями."""
+
+    comments = CommentSerialiser(
+        source='post_comments', many=True, read_only=True
+    )
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ('comments',)
@@ -1,9 +1,26 @@
-from blog.models import Comment, Post
+import json
+from datetime import timedelta
+
+from blog.models import (
+    Comment,
+    ImageRendition,
+    Images,
+    Like,
+    Post,
+    Timeline,
+)
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from djoser.serializers import UserSerializer as DjoserUserSerializer
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
-from user.models import User
+from user.models import Follow, Rating, User
 
+from .mappers import comment_mapper, post_mapper, user_mapper
+from .renderers import FastJSONRenderer
 from .serializers import CommentSerialiser, PostSerializer, UserSerializer
 
 
@@ -65,7 +82,7 @@ class APIUserTests(APITestCase):
         self.assertEqual(client_req.status_code, status.HTTP_401_UNAUTHORIZED)
         # Request of authenticated user
         self.assertEqual(auth_req.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(auth_req.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(auth_req.data['results'], serializer)  # type: ignore # noqa: E501
 
     def test_get_my_profile(self):
         """Запрос данных своего профиля."""
@@ -83,6 +100,18 @@ class APIUserTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
         self.assertDictEqual(response.data, serializer)  # type: ignore # noqa: E501
 
+    def test_get_user_conditional(self):
+        """Условный запрос чужого профиля не обходит проверку прав."""
+        url = f'/api/users/{self.u.id}/'
+        response = self.user.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        response = self.user.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)  # type: ignore # noqa: E501
+        for etag in ('*', response['ETag']):
+            with self.subTest(etag=etag):
+                response = self.other.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)  # type: ignore # noqa: E501
+
     def test_update_profile(self):
         """Обновление данных своего профиля."""
         url = f'/api/users/{self.u.id}/'
@@ -109,7 +138,25 @@ class APIUserTests(APITestCase):
         ).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
+
+    def test_top_authors(self):
+        """Запрос топ-листа авторов и места автора в нём."""
+        Rating.objects.toggle(self.o, self.u)
+        response = self.user.get('/api/users/top/?period=month')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        self.assertEqual(
+            [(user['id'], user['top_rating']) for user in response.data],  # type: ignore # noqa: E501
+            [(self.o.id, 1)],
+        )
+        response = self.user.get(f'/api/users/{self.o.id}/rank/')
+        self.assertEqual(
+            response.data, {'period': 'all', 'rank': 1, 'rating': 1}  # type: ignore # noqa: E501
+        )
+        response = self.user.get(f'/api/users/{self.u.id}/rank/')
+        self.assertIsNone(response.data['rank'])  # type: ignore # noqa: E501
+        response = self.user.get('/api/users/top/?period=year')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # type: ignore # noqa: E501
 
 
 class APIPostTests(APITestCase):
@@ -159,7 +206,7 @@ class APIPostTests(APITestCase):
         serializer = PostSerializer(Post.objects.all(), many=True).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
 
     def test_get_some_post(self):
         """Запрос поста по id."""
@@ -177,7 +224,7 @@ class APIPostTests(APITestCase):
         ).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
 
     def test_update_post(self):
         """Обновление данных поста."""
@@ -236,8 +283,8 @@ class APIPostTests(APITestCase):
         response_h = self.user.get(url_h)
         self.assertEqual(response_p.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
         self.assertEqual(response_h.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response_p.data, serializer_p)  # type: ignore # noqa: E501
-        self.assertEqual(response_h.data, serializer_h)  # type: ignore # noqa: E501
+        self.assertEqual(response_p.data['results'], serializer_p)  # type: ignore # noqa: E501
+        self.assertEqual(response_h.data['results'], serializer_h)  # type: ignore # noqa: E501
 
     def test_filter_for_posts_by_author(self):
         """Фильтрация постов по автору."""
@@ -247,7 +294,7 @@ class APIPostTests(APITestCase):
         ).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
 
     def test_search_for_post_by_title(self):
         """Поиск постов по заголовку."""
@@ -260,7 +307,7 @@ class APIPostTests(APITestCase):
         ).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
 
     def test_search_for_posts_by_text(self):
         """Поиск постов по тексту."""
@@ -273,20 +320,28 @@ class APIPostTests(APITestCase):
         ).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
 
     def test_search_for_posts_by_created(self):
         """Поиск постов по дате создания."""
-        url = f'/api/posts/?search={self.p.created.day}'
-        serializer = PostSerializer(
-            Post.objects.filter(
-                created__icontains=self.p.created.day
-            ).order_by('-created'),
-            many=True,
-        ).data
-        response = self.user.get(url)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        day = timezone.localdate(self.p.created)
+        old = Post.objects.create(author=self.u, title='old', text='old')
+        Post.objects.filter(id=old.id).update(  # type: ignore # noqa: E501
+            created=self.p.created - timedelta(days=400)
+        )
+        for search in (day.isoformat(), day.strftime('%d.%m.%Y')):
+            url = f'/api/posts/?search={search}'
+            serializer = PostSerializer(
+                Post.objects.filter(created__date=day).order_by('-created'),
+                many=True,
+            ).data
+            response = self.user.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+            self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
+            self.assertNotIn(old.id, [post['id'] for post in response.data['results']])  # type: ignore # noqa: E501
+        response = self.user.get(f'/api/posts/?search={day.year}')
+        self.assertIn(self.p.id, [post['id'] for post in response.data['results']])  # type: ignore # noqa: E501
+        self.assertNotIn(old.id, [post['id'] for post in response.data['results']])  # type: ignore # noqa: E501
 
     def test_order_by_for_posts_by_created(self):
         """Группировка постов по дате создания."""
@@ -296,7 +351,235 @@ class APIPostTests(APITestCase):
         ).data
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serializer)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serializer)  # type: ignore # noqa: E501
+
+    @override_settings(API_MAX_PAGE_SIZE=2)
+    def test_cursor_pagination(self):
+        """Обход страниц по курсору с сортировкой и размером страницы."""
+        for title in ('b', 'a', 'b', 'c'):
+            Post.objects.create(author=self.u, title=title, text='text')
+        expected = list(
+            Post.objects.filter(author=self.u)
+            .order_by('title', 'id')
+            .values_list('id', flat=True)
+        )
+        url = f'/api/posts/?author={self.u.username}&ordering=title&page_size=50'  # type: ignore # noqa: E501
+        pages = []
+        while url:
+            response = self.user.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+            self.assertLessEqual(len(response.data['results']), 2)  # type: ignore # noqa: E501
+            pages.append([post['id'] for post in response.data['results']])  # type: ignore # noqa: E501
+            url = response.data['next']  # type: ignore
+        self.assertEqual(sum(pages, []), expected)
+        response = self.user.get(response.data['previous'])  # type: ignore # noqa: E501
+        previous = [post['id'] for post in response.data['results']]  # type: ignore # noqa: E501
+        self.assertEqual(previous, pages[-2])
+
+    def test_ordering_fields(self):
+        """Сортировка только по столбцам из ordering_fields."""
+        self.p.tags.add('second', 'third')
+        for url in ('/api/posts/?ordering=tags', '/api/posts/?ordering=author__username'):  # type: ignore # noqa: E501
+            with self.subTest(url=url):
+                response = self.user.get(url)
+                ids = [post['id'] for post in response.data['results']]  # type: ignore # noqa: E501
+                self.assertEqual(len(ids), len(set(ids)))
+        response = self.user.get(f'/api/posts/{self.p.id}/comments/?ordering=title')  # type: ignore # noqa: E501
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_export_posts(self):
+        """Потоковая выгрузка постов с комментариями и меткой updated."""
+        url = '/api/posts/export/?comments=1'
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)  # type: ignore # noqa: E501
+        response = self.user.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]  # type: ignore # noqa: E501
+        self.assertEqual([row['id'] for row in rows], [self.p.id, self.hp.id])  # type: ignore # noqa: E501
+        self.assertEqual(rows[0]['tags'], ['tag'])
+        self.assertEqual(
+            [comment['text'] for comment in rows[0]['comments']],
+            ['comment1', 'comment2', 'comment3'],
+        )
+        response = self.user.get(
+            '/api/posts/export/', {'updated_since': rows[-1]['updated']}
+        )
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]  # type: ignore # noqa: E501
+        self.assertEqual([row['id'] for row in rows], [self.hp.id])  # type: ignore # noqa: E501
+        self.assertNotIn('comments', rows[0])
+        response = self.user.get('/api/posts/export/?updated_since=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # type: ignore # noqa: E501
+
+    def test_top_posts(self):
+        """Запрос топ-листа постов."""
+        Like.likemanager.create_or_delete(user=self.o, obj=self.p)
+        response = self.user.get('/api/posts/top/?period=week')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        self.assertEqual(
+            [(post['id'], post['top']) for post in response.data],  # type: ignore # noqa: E501
+            [(self.p.id, 1)],  # type: ignore
+        )
+        response = self.user.get('/api/posts/top/?period=year')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # type: ignore # noqa: E501
+
+    @override_settings(BACKGROUND_THREADS=0)
+    def test_feed(self):
+        """Запрос ленты подписок."""
+        Follow.objects.create(user=self.o, author=self.u)
+        for number in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.post(
+                    '/api/posts/', {'title': f'feed {number}', 'text': 'text'}
+                )
+        response = self.other.get('/api/feed/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        titles = [post['title'] for post in response.data['results']]  # type: ignore # noqa: E501
+        self.assertEqual(titles, ['feed 2', 'feed 1', 'feed 0'])
+        self.assertIsNone(response.data['next'])  # type: ignore # noqa: E501
+        response = self.user.get('/api/feed/')
+        self.assertEqual(response.data['results'], [])  # type: ignore # noqa: E501
+
+    @override_settings(BACKGROUND_THREADS=0)
+    def test_bulk_create_posts(self):
+        """Создание списка постов пачкой с тегами."""
+        Follow.objects.create(user=self.o, author=self.u)
+
+        def create(count):
+            data = [
+                {'title': f'bulk {n}', 'text': 'text', 'tags': ['tag', f'bulk {n}']}  # type: ignore # noqa: E501
+                for n in range(count)
+            ]
+            with self.captureOnCommitCallbacks(execute=True):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.user.post('/api/posts/bulk/', data)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)  # type: ignore # noqa: E501
+            return response.data, len(queries)  # type: ignore
+
+        data, queries = create(2)
+        self.assertEqual(
+            [(post['title'], sorted(post['tags'])) for post in data],
+            [('bulk 0', ['bulk 0', 'tag']), ('bulk 1', ['bulk 1', 'tag'])],
+        )
+        self.assertEqual(
+            set(Post.objects.get(id=data[0]['id']).similar_posts()),
+            {Post.objects.get(id=data[1]['id']), self.p},
+        )
+        self.assertIn(data[1]['id'], Timeline.objects.filter(user=self.o).values_list('post_id', flat=True))  # type: ignore # noqa: E501
+        self.assertEqual(create(6)[1], queries)
+        response = self.user.post('/api/posts/bulk/', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # type: ignore # noqa: E501
+
+    def test_sparse_fields(self):
+        """Выбор полей ответа сужает и сериалайзер, и SQL-запрос."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.user.get('/api/posts/?fields=id,title,author')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        self.assertEqual(
+            response.data['results'][0],  # type: ignore
+            {
+                'id': self.hp.id,  # type: ignore
+                'title': 'hidden',
+                'author': {'id': self.u.id, 'username': 'user', 'email': 'user@mail.ru'},  # type: ignore # noqa: E501
+            },
+        )
+        sql = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"blog_post"."text"', sql)
+        self.assertNotIn('taggit', sql)
+        # Пост и его теги, колонки валидаторов читаются тем же запросом
+        url = f'/api/posts/{self.p.id}/?fields=tags'  # type: ignore
+        with self.assertNumQueries(2):
+            response = self.user.get(url)
+        self.assertEqual(response.data, {'tags': ['tag']})  # type: ignore # noqa: E501
+        with self.assertNumQueries(2):
+            response = self.user.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)  # type: ignore # noqa: E501
+        response = self.user.get('/api/posts/?fields=id,password')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  # type: ignore # noqa: E501
+
+    def test_row_mappers_parity(self):
+        """Быстрый путь чтения даёт те же байты, что и сериалайзеры."""
+        post = Post.objects.create(
+            author=self.o, title='Пост', text='строка\u2028и «кавычки»'
+        )
+        # Теги создаются и добавляются посту в разном порядке, оба не по
+        # алфавиту
+        for name in ('бета', 'alpha', 'zeta'):
+            self.p.tags.add(name)
+        for name in ('другой', 'zeta', 'бета', 'alpha'):
+            post.tags.add(name)
+        image = Images.objects.create(post=post, image='images/img.jpg')
+        Images.objects.create(post=self.p, image='images/logo.png')
+        ImageRendition.objects.create(
+            image=image,
+            variant='original',
+            file='renditions/img.webp',
+            width=1,
+            height=1,
+        )
+        Like.likemanager.create_or_delete(user=self.u, obj=post)
+        cases = (
+            (PostSerializer, post_mapper, Post),
+            (CommentSerialiser, comment_mapper, Comment),
+            (UserSerializer, user_mapper, User),
+        )
+        for serializer_class, mapper, model in cases:
+            with self.subTest(model=model.__name__):
+                queryset = model.objects.order_by('id')
+                expected = JSONRenderer().render(
+                    serializer_class(queryset, many=True).data
+                )
+                rows = list(mapper.values(queryset))
+                self.assertEqual(FastJSONRenderer().render(mapper.map(rows)), expected)  # type: ignore # noqa: E501
+        for url in ('/api/posts/', f'/api/posts/{post.id}/', '/api/posts/my/', f'/api/posts/{self.p.id}/comments/', '/api/users/'):  # type: ignore # noqa: E501
+            with self.subTest(url=url):
+                with override_settings(API_ROW_MAPPERS=False):
+                    expected = self.user.get(url).content
+                self.assertEqual(self.user.get(url).content, expected)
+
+    def test_conditional_get(self):
+        """Ответ 304 на неизменённые пост, список постов и комментарии."""
+        # Пост читается с тегами и изображениями до проверки прав,
+        # для списков достаточно агрегата
+        queries = {
+            f'/api/posts/{self.p.id}/': 3,  # type: ignore
+            '/api/posts/?status=published': 1,
+            f'/api/posts/{self.p.id}/comments/': 1,  # type: ignore
+        }
+        urls = tuple(queries)
+        etags = {}
+        for url in urls:
+            response = self.user.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+            self.assertIn('Last-Modified', response)
+            etags[url] = response['ETag']
+            with self.assertNumQueries(queries[url]):
+                response = self.user.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)  # type: ignore # noqa: E501
+            self.assertEqual(response['ETag'], etags[url])
+        Like.likemanager.create_or_delete(user=self.o, obj=self.p)
+        Comment.objects.create(author=self.o, post=self.p, text='new')
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.user.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+                self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_list_conditional_get_likes(self):
+        """ETag списка постов меняется при переносе лайка и новом фото."""
+        post = Post.objects.create(author=self.u, title='second', text='text')
+        Like.likemanager.create_or_delete(user=self.o, obj=self.p)
+        url = '/api/posts/'
+        etag = self.user.get(url)['ETag']
+        Like.likemanager.create_or_delete(user=self.o, obj=self.p)
+        Like.likemanager.create_or_delete(user=self.o, obj=post)
+        response = self.user.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        Images.objects.create(post=post, image='images/img.jpg')
+        response = self.user.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
 
     def test_of_comments_the_post(self):
         """Запрос комментариев конкретного поста."""
@@ -306,4 +589,81 @@ class APIPostTests(APITestCase):
             Comment.objects.filter(post=self.p).order_by('-created'), many=True
         ).data
         self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
-        self.assertEqual(response.data, serialiser)  # type: ignore # noqa: E501
+        self.assertEqual(response.data['results'], serialiser)  # type: ignore # noqa: E501
+
+
+class APIQueryBudgetTests(APITestCase):
+    """Количество запросов к базе не зависит от размера ответа."""
+
+    # Адрес и допустимое количество запросов при любом объёме данных.
+    # Списки постов и комментариев делают ещё агрегат для ETag.
+    budgets = (
+        ('/api/posts/', 5),
+        ('/api/posts/my/', 4),
+        ('/api/posts/top/', 4),
+        ('/api/posts/{post}/comments/', 2),
+        ('/api/feed/', 5),
+        ('/api/users/', 1),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        """Создание объектов на уровне класса."""
+        cls.u = User.objects.create_user(
+            username='user',
+            password='user12',
+            email='user@mail.ru',
+            is_active=True,
+        )
+        cls.o = User.objects.create_user(
+            username='other',
+            password='other12',
+            email='other@mail.ru',
+            is_active=True,
+        )
+        Follow.objects.create(user=cls.o, author=cls.u)
+        cls.p = cls.add_posts(1)[0]
+
+    @classmethod
+    def add_posts(cls, count):
+        """Посты с тегами, изображениями, комментариями и лайками."""
+        posts = []
+        for number in range(count):
+            post = Post.objects.create(
+                author=cls.u, title=f'post {number}', text='text'
+            )
+            post.tags.add(f'tag {number}', 'common')
+            Images.objects.create(post=post, image='images/img.jpg')
+            Like.likemanager.create_or_delete(user=cls.o, obj=post)
+            Timeline.objects.fan_out(post.id)
+            posts.append(post)
+        Comment.objects.bulk_create(
+            Comment(author=author, post=posts[0], text='comment')
+            for author in (cls.u, cls.o) * count
+        )
+        return posts
+
+    def setUp(self):
+        """Создание клиентов на уровне теста."""
+        self.user = APIClient()
+        self.user.force_authenticate(self.u)
+        self.other = APIClient()
+        self.other.force_authenticate(self.o)
+
+    def count_queries(self, url):
+        """Количество запросов к базе при получении адреса url."""
+        client = self.other if url == '/api/feed/' else self.user
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url.format(post=self.p.id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)  # type: ignore # noqa: E501
+        return len(queries)
+
+    def test_query_budget(self):
+        """Бюджет запросов каждого адреса при росте числа объектов."""
+        small = {url: self.count_queries(url) for url, _ in self.budgets}
+        self.add_posts(5)
+        for url, budget in self.budgets:
+            with self.subTest(url=url):
+                queries = self.count_queries(url)
+                self.assertEqual(queries, small[url])
+                self.assertLessEqual(queries, budget)
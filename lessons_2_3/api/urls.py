@@ -1,13 +1,14 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import PostViewSet, UserViewSet
+from .views import FeedViewSet, PostViewSet, UserViewSet
 
 router = DefaultRouter()
 
 
 router.register('users', UserViewSet, basename='users')
 router.register('posts', PostViewSet, basename='posts')
+router.register('feed', FeedViewSet, basename='feed')
 
 
 urlpatterns = [
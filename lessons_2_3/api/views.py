@@ -1,49 +1,244 @@
-from blog.models import Comment, Post
+import json
+from functools import partial
+
+from blog.cache import (
+    POSTS_DATA_VERSION_KEY,
+    conditional_response,
+    get_post_versions,
+    get_versions,
+    list_version_key,
+    make_etag,
+    version_time,
+)
+from blog.models import TOP_PERIODS, Comment, Post, Timeline, TopPost
+from blog.tasks import run_on_commit
+from blog.utils import assemble_feed
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import (
+    Count,
+    Max,
+    Prefetch,
+    prefetch_related_objects,
+)
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
+from rest_framework import filters, mixins, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from user.models import TOP_AUTHOR_PERIODS, TopAuthor
 
+from .filters import PostSearchFilter
+from .mappers import comment_mapper, post_mapper, user_mapper
+from .mixins import RowMapperMixin, SparseFieldsMixin
+from .pagination import KeysetPagination
 from .permissions import PostCommentPermisson, UserPermission
-from .serializers import CommentSerialiser, PostSerializer, UserSerializer
+from .serializers import (
+    CommentSerialiser,
+    PostExportSerializer,
+    PostSerializer,
+    TopAuthorSerializer,
+    TopPostSerializer,
+    UserSerializer,
+)
 
 User = get_user_model()
 
+# Связи постов, которые читает PostSerializer
+POST_PREFETCH = ('tags', 'images__renditions')
+
+# Данные модели Post, которые читает каждое поле PostSerializer
+POST_SPARSE_FIELDS = {
+    'id': ('id',),
+    'author': ('author', 'author__username', 'author__email'),
+    'title': ('title',),
+    'text': ('text',),
+    'created': ('created',),
+    'updated': ('updated',),
+    'status': ('status',),
+    'tags': ('tags',),
+    'likes_count': ('likes_count',),
+    'images': ('images__renditions',),
+}
+
+
+def list_validators(request, queryset, *versions):
+    """ETag и Last-Modified страницы списка постов или комментариев.
+
+    Считаются одним агрегирующим запросом: количество строк и MAX(updated)
+    объектов и их авторов. Лайки, теги, изображения и комментарии не
+    меняют updated, поэтому в валидаторы входят версии кэша, которые
+    сбрасывают их изменения.
+    """
+    stats = queryset.aggregate(
+        count=Count('id'),
+        updated=Max('updated'),
+        authors=Max('author__updated'),
+    )
+    etag = make_etag(request.get_full_path(), *versions, *stats.values())
+    times = [
+        stats['updated'],
+        stats['authors'],
+        *(version_time(version) for version in versions),
+    ]
+    return etag, max(time for time in times if time is not None)
+
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(RowMapperMixin, viewsets.ModelViewSet):
     """Обработка запросов на users URL."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    row_mapper = user_mapper
+    mapper_actions = ('list',)
     permission_classes = (UserPermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ('is_active',)
 
+    def retrieve(self, request, *args, **kwargs):
+        """Запрос пользователя с поддержкой условных запросов.
+
+        Валидаторы вычисляются после проверки прав на объект.
+        """
+        user = self.get_object()
+        return conditional_response(
+            request,
+            make_etag('user', user.id, user.updated.isoformat()),
+            user.updated,
+            lambda: Response(self.get_serializer(user).data),
+        )
+
     def destroy(self, request, *args, **kwargs):
         User.objects.filter(id=self.get_object().id).update(is_active=False)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_period(self, request):
+        """Период топ-листа из запроса, None при недопустимом значении."""
+        period = request.query_params.get('period', 'all')
+        return period if period in dict(TOP_AUTHOR_PERIODS) else None
 
-class PostViewSet(viewsets.ModelViewSet):
+    def period_error(self):
+        """Ответ на запрос с недопустимым периодом."""
+        return Response(
+            {
+                'period': [
+                    'Допустимые значения: '
+                    f'{", ".join(dict(TOP_AUTHOR_PERIODS))}'
+                ]
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(
+        methods=['GET'],
+        url_name='top',
+        url_path='top',
+        detail=False,
+        serializer_class=TopAuthorSerializer,
+    )
+    def top(self, request):
+        """Запрос топ-листа авторов за период: all, month или week."""
+        period = self.get_period(request)
+        if period is None:
+            return self.period_error()
+        serializer = self.get_serializer(
+            TopAuthor.objects.top(period), many=True
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(methods=['GET'], url_name='rank', url_path='rank', detail=True)
+    def rank(self, request, pk):
+        """Запрос места автора в топ-листе за период."""
+        period = self.get_period(request)
+        if period is None:
+            return self.period_error()
+        user = get_object_or_404(User, id=pk)
+        rank, rating = TopAuthor.objects.rank(user.id, period) or (None, 0)
+        return Response(
+            {'period': period, 'rank': rank, 'rating': rating},
+            status=status.HTTP_200_OK,
+        )
+
+
+class PostViewSet(SparseFieldsMixin, RowMapperMixin, viewsets.ModelViewSet):
     """Обработка запросов на posts URL."""
 
-    queryset = Post.objects.all()
+    queryset = Post.objects.select_related('author').prefetch_related(
+        *POST_PREFETCH
+    )
     serializer_class = PostSerializer
     permission_classes = (PostCommentPermisson,)
     filter_backends = (
         DjangoFilterBackend,
-        filters.SearchFilter,
+        PostSearchFilter,
         filters.OrderingFilter,
     )
     filterset_fields = ('status', 'author__username')
-    search_fields = ('title', 'text', 'created')
+    # Ключ курсорной пагинации: только столбцы NOT NULL самой таблицы
+    ordering_fields = ('created', 'updated', 'title', 'likes_count', 'id')
+    search_fields = ('title', 'text')
+    search_date_fields = ('created',)
+    sparse_fields = POST_SPARSE_FIELDS
+    # Колонки валидаторов условного запроса поста
+    sparse_required = {
+        'retrieve': ('updated', 'author', 'author__updated', 'likes_count')
+    }
+    sparse_actions = ('list', 'retrieve', 'my')
+    row_mapper = post_mapper
+    mapper_actions = ('list', 'my', 'comments')
+
+    def list(self, request, *args, **kwargs):
+        """Запрос списка постов с поддержкой условных запросов."""
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = list_validators(
+            request,
+            queryset,
+            *get_versions(list_version_key(), POSTS_DATA_VERSION_KEY),
+        )
+        return conditional_response(
+            request,
+            etag,
+            last_modified,
+            partial(super().list, request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Запрос поста с поддержкой условных запросов.
+
+        Валидаторы вычисляются после проверки прав на пост: из дат
+        изменения поста и автора, счётчика лайков и версии кэша страницы
+        поста, которую сбрасывают изменения тегов, изображений и лайков.
+        """
+        post = self.get_object()
+        version = get_post_versions(post.id)['body']
+        etag = make_etag(
+            'post',
+            post.id,
+            post.updated.isoformat(),
+            post.author.updated.isoformat(),
+            post.total_likes,
+            version,
+        )
+        return conditional_response(
+            request,
+            etag,
+            max(post.updated, post.author.updated, version_time(version)),
+            lambda: Response(self.get_serializer(post).data),
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        run_on_commit(Timeline.objects.fan_out, post.id)
 
     def destroy(self, request, *args, **kwargs):
-        Post.objects.filter(id=self.get_object().id).update(status='hidden')
+        post = self.get_object()
+        post.status = 'hidden'
+        post.save(update_fields=['status'])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -55,9 +250,14 @@ class PostViewSet(viewsets.ModelViewSet):
     )
     def my(self, request):
         """Запрос постов пользователя."""
-        posts = Post.objects.filter(author=request.user)
-        serializer = self.get_serializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        posts = self.filter_queryset(
+            self.get_queryset().filter(author=request.user)
+        )
+        if self.use_row_mapper():
+            return self.map_page(posts)
+        page = self.paginate_queryset(posts)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         methods=['GET'],
@@ -66,9 +266,135 @@ class PostViewSet(viewsets.ModelViewSet):
         detail=True,
         permission_classes=(PostCommentPermisson,),
         serializer_class=CommentSerialiser,
+        ordering_fields=('created', 'updated', 'likes_count', 'id'),
     )
     def comments(self, request, pk):
         """Запрос комментариев поста."""
-        comments = Comment.objects.filter(post=pk)
-        serializer = self.get_serializer(comments, many=True)
+        comments = Comment.objects.filter(post=pk).select_related('author')
+
+        def build():
+            if self.use_row_mapper():
+                return self.map_page(comments, comment_mapper)
+            page = self.paginate_queryset(comments)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        etag, last_modified = list_validators(
+            request, comments, get_post_versions(pk)['comments']
+        )
+        return conditional_response(request, etag, last_modified, build)
+
+    @action(methods=['POST'], url_name='bulk', url_path='bulk', detail=False)
+    def bulk(self, request):
+        """Создание списка постов одной транзакцией."""
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.API_BULK_MAX_POSTS,
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            posts = serializer.save(author=request.user)
+        prefetch_related_objects(posts, *POST_PREFETCH)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['GET'],
+        url_name='export',
+        url_path='export',
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def export(self, request):
+        """Потоковая выгрузка постов в формате NDJSON.
+
+        Посты читаются серверным курсором порциями по EXPORT_CHUNK_SIZE, а
+        теги, изображения и при ?comments=1 комментарии загружаются для
+        каждой порции, поэтому расход памяти не зависит от объёма выгрузки.
+        Посты идут по возрастанию updated: значение из последней строки
+        передаётся в ?updated_since= при следующей выгрузке.
+        """
+        posts = self.filter_queryset(self.get_queryset())
+        updated_since = request.query_params.get('updated_since')
+        if updated_since is not None:
+            try:
+                since = parse_datetime(updated_since)
+            except ValueError:
+                since = None
+            if since is None:
+                return Response(
+                    {'updated_since': ['Ожидается дата и время ISO 8601.']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            posts = posts.filter(updated__gte=since)
+        serializer_class = PostSerializer
+        if request.query_params.get('comments') in ('1', 'true'):
+            serializer_class = PostExportSerializer
+            posts = posts.prefetch_related(
+                Prefetch(
+                    'post_comments',
+                    queryset=Comment.objects.select_related('author'),
+                )
+            )
+        serializer = serializer_class(context=self.get_serializer_context())
+        posts = posts.order_by('updated', 'id').iterator(
+            chunk_size=settings.EXPORT_CHUNK_SIZE
+        )
+        rows = (
+            json.dumps(
+                serializer.to_representation(post),
+                cls=JSONEncoder,
+                ensure_ascii=False,
+            )
+            + '\n'
+            for post in posts
+        )
+        return StreamingHttpResponse(rows, content_type='application/x-ndjson')
+
+    @action(
+        methods=['GET'],
+        url_name='top',
+        url_path='top',
+        detail=False,
+        permission_classes=(PostCommentPermisson,),
+        serializer_class=TopPostSerializer,
+    )
+    def top(self, request):
+        """Запрос топ-листа постов за период: all, week или day."""
+        period = request.query_params.get('period', 'all')
+        if period not in dict(TOP_PERIODS):
+            return Response(
+                {
+                    'period': [
+                        f'Допустимые значения: {", ".join(dict(TOP_PERIODS))}'
+                    ]
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(
+            TopPost.objects.top(period).prefetch_related(*POST_PREFETCH),
+            many=True,
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class FeedViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Лента постов авторов, на которых подписан пользователь."""
+
+    serializer_class = PostSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def list(self, request, *args, **kwargs):
+        page = assemble_feed(
+            request.user,
+            request.query_params.get(self.paginator.cursor_query_param),
+            self.paginator.get_page_size(request),
+        )
+        posts = self.paginator.paginate_page(page, request)
+        prefetch_related_objects(posts, *POST_PREFETCH)
+        serializer = self.get_serializer(posts, many=True)
+        return self.get_paginated_response(serializer.data)
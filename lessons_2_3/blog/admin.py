@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Post
+from .utils import published_comments_count
 
 
 @admin.register(Post)
@@ -12,9 +13,11 @@ class AdminPost(admin.ModelAdmin):
         'created',
         'updated',
         'status',
+        'likes_count',
         'tag_list',
     )
     list_filter = ('author', 'status')
+    readonly_fields = ('likes_count', 'comments_count')
     search_fields = ('author', 'title', 'text')
 
     def tag_list(self, obj):
@@ -23,6 +26,22 @@ class AdminPost(admin.ModelAdmin):
 
 @admin.register(Comment)
 class AdminComment(admin.ModelAdmin):
-    list_display = ('author', 'post', 'text', 'created', 'updated', 'status')
+    list_display = (
+        'author',
+        'post',
+        'text',
+        'created',
+        'updated',
+        'status',
+        'likes_count',
+    )
     list_filter = ('status', 'created')
+    readonly_fields = ('likes_count',)
     search_fields = ('author', 'post', 'text')
+
+    def delete_queryset(self, request, queryset):
+        post_ids = set(queryset.values_list('post_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Post.objects.filter(id__in=post_ids).update(
+            comments_count=published_comments_count()
+        )
@@ -0,0 +1,182 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+POST_FRAGMENTS = ('body', 'comments')
+
+# Версия данных постов в списках: лайков, тегов, изображений и их копий.
+# Сбрасывается вместе с фрагментом body страницы любого поста.
+POSTS_DATA_VERSION_KEY = 'blog:posts:data:version'
+
+# Интервал проверки кэша запросом, который ждёт построения страницы, секунды
+PAGE_CACHE_POLL_INTERVAL = 0.05
+
+
+def version_key(post_id, fragment):
+    """Ключ версии фрагмента страницы поста."""
+    return f'blog:post:{post_id}:{fragment}:version'
+
+
+def list_version_key(tag=None):
+    """Ключ версии списков постов: общей или для тега со слагом tag."""
+    return f'blog:tag:{tag}:version' if tag else 'blog:list:version'
+
+
+def new_version():
+    """Новая версия: не повторяется даже после вытеснения ключа из кэша."""
+    return str(time.time_ns())
+
+
+def version_time(version):
+    """Момент смены версии: версия - время в наносекундах."""
+    return datetime.fromtimestamp(int(version) / 10**9, tz=timezone.utc)
+
+
+def get_versions(*keys):
+    """Текущие значения версий, отсутствующие создаются."""
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_versions(*keys):
+    """Смена версий сейчас и повторно после фиксации транзакции.
+
+    Повторная смена не даёт параллельному запросу сохранить в кэше данные,
+    прочитанные до фиксации изменений.
+    """
+
+    def bump():
+        cache.set_many({key: new_version() for key in keys}, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_post_versions(post_id):
+    """Текущие версии фрагментов страницы поста."""
+    versions = get_versions(
+        *(version_key(post_id, part) for part in POST_FRAGMENTS)
+    )
+    return dict(zip(POST_FRAGMENTS, versions))
+
+
+def bump_post_versions(post_id, *fragments):
+    """Сброс фрагментов страницы поста, по умолчанию всех.
+
+    Вместе с фрагментом body сбрасывается версия данных постов в списках.
+    """
+    fragments = fragments or POST_FRAGMENTS
+    keys = [version_key(post_id, part) for part in fragments]
+    if 'body' in fragments:
+        keys.append(POSTS_DATA_VERSION_KEY)
+    bump_versions(*keys)
+
+
+def get_post_fragment(post_id, fragment, version, build):
+    """Фрагмент страницы поста из кэша, при промахе - результат build()."""
+    key = f'blog:post:{post_id}:{fragment}:{version}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, settings.POST_CACHE_TIMEOUT)
+    return data
+
+
+def page_key(name, page=None):
+    """Ключ страницы списка name с курсором page в кэше страниц."""
+    page = hashlib.md5((page or '').encode()).hexdigest()
+    return f'blog:page:{name}:{page}'
+
+
+def wait_for_page(key):
+    """Запись кэша страниц, которую строит запрос с блокировкой.
+
+    Ждёт не дольше PAGE_CACHE_WAIT_TIMEOUT, при таймауте возвращает None.
+    """
+    deadline = time.monotonic() + settings.PAGE_CACHE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(PAGE_CACHE_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached_page(request, name, version_keys, build):
+    """Ответ для анонимного посетителя из кэша страниц.
+
+    Ключ записи - имя списка name и номер страницы из параметра page,
+    остальные параметры запроса не учитываются. Запись хранит версии, с
+    которыми построен ответ, и время, до которого он считается свежим.
+    Отсутствующий или устаревший ответ строит только запрос, получивший
+    блокировку. Остальные тем временем отдают прежний ответ, а если его
+    нет - ждут, пока запись появится.
+    """
+    if request.method != 'GET' or request.user.is_authenticated:
+        return build()
+    key = page_key(name, request.GET.get('page'))
+    versions = get_versions(*version_keys)
+    entry = cache.get(key)
+    if entry is not None:
+        entry_versions, fresh_until, response = entry
+        if entry_versions == versions and fresh_until > time.time():
+            return response
+    lock = cache.add(f'{key}:lock', 1, settings.PAGE_CACHE_LOCK_TIMEOUT)
+    if not lock:
+        entry = entry or wait_for_page(key)
+        if entry is not None:
+            return entry[2]
+    try:
+        response = build()
+        if response.status_code == 200 and not response.cookies:
+            cache.set(
+                key,
+                (
+                    versions,
+                    time.time() + settings.PAGE_CACHE_TIMEOUT,
+                    response,
+                ),
+                settings.PAGE_CACHE_TIMEOUT
+                + settings.PAGE_CACHE_STALE_TIMEOUT,
+            )
+    finally:
+        if lock:
+            cache.delete(f'{key}:lock')
+    return response
+
+
+def make_etag(*parts):
+    """ETag из значений, от которых зависит представление ресурса."""
+    data = ':'.join(str(part) for part in parts)
+    return f'"{hashlib.md5(data.encode()).hexdigest()}"'
+
+
+def conditional_response(request, etag, last_modified, build):
+    """Ответ 304, если у клиента актуальная версия ресурса, иначе build().
+
+    Валидаторы вычисляются до построения ответа, поэтому неизменённый
+    ресурс не сериализуется и не рендерится.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return build()
+    timestamp = int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(timestamp)
+    return response
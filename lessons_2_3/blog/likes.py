@@ -0,0 +1,96 @@
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import caches
+
+GENERATION_KEY = 'likes:generation'
+FLUSHED_KEY = 'likes:flushed'
+FLUSH_LOCK_KEY = 'likes:flush:lock'
+FLUSH_LOCK_TIMEOUT = 5 * 60
+
+
+def buffer_cache():
+    """Кэш, в котором накапливаются переключения лайков."""
+    return caches[settings.LIKE_BUFFER_CACHE]
+
+
+def state_key(generation, type_id, object_id, user_id):
+    """Ключ желаемого состояния лайка пользователя в поколении буфера."""
+    return f'likes:{generation}:state:{type_id}:{object_id}:{user_id}'
+
+
+def delta_key(generation, type_id, object_id):
+    """Ключ изменения счётчика лайков объекта в поколении буфера."""
+    return f'likes:{generation}:delta:{type_id}:{object_id}'
+
+
+def sequence_key(generation):
+    """Ключ количества событий в поколении буфера."""
+    return f'likes:{generation}:sequence'
+
+
+def event_key(generation, number):
+    """Ключ события с номером number в поколении буфера."""
+    return f'likes:{generation}:event:{number}'
+
+
+def pending_generations(cache):
+    """Поколения буфера, ещё не записанные в базу, от новых к старым.
+
+    Первое из них - текущее, в него пишутся новые переключения.
+    """
+    current = cache.get_or_set(GENERATION_KEY, 1, None)
+    flushed = cache.get(FLUSHED_KEY, 0)
+    return list(range(current, flushed, -1))
+
+
+def pending_likes(obj):
+    """Изменение количества лайков объекта, ещё не записанное в базу."""
+    if not settings.LIKE_BUFFER:
+        return 0
+    cache = buffer_cache()
+    content_type_id = ContentType.objects.get_for_model(obj).id
+    deltas = cache.get_many(
+        [
+            delta_key(generation, content_type_id, obj.id)
+            for generation in pending_generations(cache)
+        ]
+    )
+    return sum(deltas.values())
+
+
+def toggle_buffered(user, obj):
+    """Переключение лайка в буфере без записи в базу данных.
+
+    Состояние лайка берётся из самого нового поколения буфера, в котором
+    оно есть, а при его отсутствии - из базы. Возвращает кортеж (лайк
+    поставлен, количество лайков с учётом буфера).
+    """
+    cache = buffer_cache()
+    content_type_id = ContentType.objects.get_for_model(obj).id
+    generations = pending_generations(cache)
+    keys = [
+        state_key(generation, content_type_id, obj.id, user.id)
+        for generation in generations
+    ]
+    states = cache.get_many(keys)
+    liked = next((states[key] for key in keys if key in states), None)
+    if liked is None:
+        liked = obj.likes.filter(user=user).exists()
+    liked = not liked
+
+    current = generations[0]
+    cache.set(keys[0], liked, None)
+    counter = delta_key(current, content_type_id, obj.id)
+    cache.add(counter, 0, None)
+    if liked:
+        cache.incr(counter)
+    else:
+        cache.decr(counter)
+    cache.add(sequence_key(current), 0, None)
+    number = cache.incr(sequence_key(current))
+    cache.set(
+        event_key(current, number),
+        (content_type_id, obj.id, user.id),
+        None,
+    )
+    return liked, obj.likes_count + pending_likes(obj)
@@ -0,0 +1,98 @@
+import uuid
+from time import perf_counter
+
+from blog.models import Post, Timeline
+from blog.utils import assemble_feed
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from user.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет рассылку поста и чтение ленты при росте числа подписчиков.'
+        ' Тестовые данные создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--followers',
+            type=int,
+            nargs='+',
+            default=[10, 100, 1000, 10000],
+            help='Количества подписчиков автора для замеров.',
+        )
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=20,
+            help='Количество постов автора.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество чтений ленты в замере.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            'подписчиков | рассылка поста, мс | '
+            'лента из Timeline, мс | лента при чтении, мс'
+        )
+        with transaction.atomic():
+            for followers in options['followers']:
+                fan_out, push, pull = self.measure(
+                    followers, options['posts'], options['repeat']
+                )
+                self.stdout.write(
+                    f'{followers:>11} | {fan_out:>18.2f} | '
+                    f'{push:>21.2f} | {pull:>20.2f}'
+                )
+            transaction.set_rollback(True)
+
+    def measure(self, followers, posts, repeat):
+        """Время рассылки поста и чтения ленты одного подписчика, мс."""
+        prefix = f'benchmark-{uuid.uuid4().hex[:8]}'
+        author = User.objects.create(
+            username=prefix, email=f'{prefix}@example.com'
+        )
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f'{prefix}-{n}', email=f'{prefix}-{n}@example.com'
+                )
+                for n in range(followers)
+            ],
+            batch_size=1000,
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=user, author=author) for user in users],
+            batch_size=1000,
+        )
+        User.objects.filter(id=author.id).update(followers_count=followers)
+        reader = users[0]
+
+        fan_out = 0.0
+        for number in range(posts):
+            post = Post.objects.create(
+                author=author, title=f'{prefix} {number}', text=prefix
+            )
+            start = perf_counter()
+            Timeline.objects.fan_out(post.id, threshold=followers + 1)
+            fan_out += perf_counter() - start
+        push = self.timeit(
+            lambda: assemble_feed(reader, threshold=followers + 1), repeat
+        )
+        Timeline.objects.filter(author=author).delete()
+        pull = self.timeit(
+            lambda: assemble_feed(reader, threshold=followers), repeat
+        )
+        return fan_out * 1000 / max(posts, 1), push, pull
+
+    def timeit(self, func, repeat):
+        """Среднее время выполнения func, мс."""
+        start = perf_counter()
+        for _ in range(repeat):
+            func()
+        return (perf_counter() - start) * 1000 / max(repeat, 1)
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import perf_counter
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync, sync_to_async
+from blog.models import Comment, Post
+from blog.tasks import get_executor
+from blog.views import (
+    LikeCommentAsyncView,
+    LikeCommentView,
+    LikePostAsyncView,
+    LikePostView,
+)
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncRequestFactory, RequestFactory
+from user.models import User
+from user.views import (
+    FollowAsyncView,
+    FollowView,
+    RatingAsyncView,
+    RatingView,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает число запросов в секунду синхронных и асинхронных'
+        ' представлений лайков, подписок и рейтинга при параллельных'
+        ' клиентах. Синхронные представления вызываются из пула потоков,'
+        ' как в многопоточном WSGI-сервере, асинхронные - из цикла событий,'
+        ' каждый клиент в своём ThreadSensitiveContext, как в ASGIHandler.'
+        ' У каждого клиента своё соединение с базой, общей транзакции нет:'
+        ' тестовые данные создаются в базе и удаляются после замеров.'
+        ' В замер входит время фоновых задач, поставленных запросами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clients',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50],
+            help='Количества параллельных клиентов для замеров.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=20,
+            help='Количество запросов одного клиента.',
+        )
+
+    def handle(self, *args, **options):
+        prefix = f'benchmark-{uuid.uuid4().hex[:8]}'
+        author = User.objects.create(
+            username=prefix, email=f'{prefix}@example.com'
+        )
+        try:
+            post = Post.objects.create(
+                author=author, title=prefix, text=prefix
+            )
+            comment = Comment.objects.create(
+                author=author, post=post, text=prefix
+            )
+            views = (
+                ('like_post', LikePostView, LikePostAsyncView, post.id),
+                (
+                    'like_comment',
+                    LikeCommentView,
+                    LikeCommentAsyncView,
+                    comment.id,
+                ),
+                ('follow', FollowView, FollowAsyncView, author.id),
+                ('rating', RatingView, RatingAsyncView, author.id),
+            )
+            self.stdout.write(
+                'представление | клиентов | синхронное, rps | '
+                'асинхронное, rps'
+            )
+            for clients in options['clients']:
+                users = User.objects.bulk_create(
+                    [
+                        User(
+                            username=f'{prefix}-{clients}-{n}',
+                            email=f'{prefix}-{clients}-{n}@example.com',
+                        )
+                        for n in range(clients)
+                    ]
+                )
+                for name, view, async_view, pk in views:
+                    sync_rps = self.measure_sync(
+                        view, users, pk, options['requests']
+                    )
+                    async_rps = async_to_sync(self.measure_async)(
+                        async_view, users, pk, options['requests']
+                    )
+                    self.stdout.write(
+                        f'{name:>13} | {clients:>8} | '
+                        f'{sync_rps:>15.0f} | {async_rps:>16.0f}'
+                    )
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def measure_sync(self, view, users, pk, requests):
+        """Запросов в секунду у синхронного view, клиент - поток."""
+        factory = RequestFactory()
+
+        def client(user):
+            try:
+                for _ in range(requests):
+                    request = factory.post('/')
+                    request.user = user
+                    view(request, pk=pk)
+            finally:
+                connections.close_all()
+
+        start = perf_counter()
+        with ThreadPoolExecutor(max_workers=len(users)) as pool:
+            list(pool.map(client, users))
+        self.wait_background()
+        return len(users) * requests / (perf_counter() - start)
+
+    async def measure_async(self, view, users, pk, requests):
+        """Запросов в секунду у асинхронного view, клиент - задача.
+
+        Синхронный код каждого клиента выполняется в отдельном потоке со
+        своим соединением, как у запросов ASGIHandler.
+        """
+        factory = AsyncRequestFactory()
+
+        async def client(user):
+            async with ThreadSensitiveContext():
+                try:
+                    for _ in range(requests):
+                        request = factory.post('/')
+                        request.user = user
+                        await view(request, pk=pk)
+                finally:
+                    await sync_to_async(connections.close_all)()
+
+        start = perf_counter()
+        await asyncio.gather(*(client(user) for user in users))
+        await sync_to_async(self.wait_background, thread_sensitive=False)()
+        return len(users) * requests / (perf_counter() - start)
+
+    def wait_background(self):
+        """Ожидание фоновых задач, поставленных запросами замера.
+
+        Каждый поток пула забирает из очереди по задаче-барьеру только
+        после всех поставленных раньше задач.
+        """
+        workers = settings.BACKGROUND_THREADS
+        if workers:
+            barrier = threading.Barrier(workers)
+            pool = get_executor(ThreadPoolExecutor, workers)
+            wait([pool.submit(barrier.wait) for _ in range(workers)])
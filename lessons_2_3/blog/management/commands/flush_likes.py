@@ -0,0 +1,32 @@
+import time
+
+from blog.utils import flush_like_buffer
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Записывает накопленные в буфере переключения лайков в базу.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Повторять запись через заданное число секунд.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество лайков, удаляемых или добавляемых за запрос.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            inserted, deleted = flush_like_buffer(options['batch_size'])
+            self.stdout.write(
+                f'Добавлено лайков: {inserted}, удалено: {deleted}'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from blog.models import RENDITION_VARIANTS, Images
+from blog.tasks import run_task
+from blog.utils import generate_renditions
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+
+class Command(BaseCommand):
+    help = 'Создаёт копии изображений, загруженных до появления конвейера.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии и для уже обработанных изображений.',
+        )
+
+    def handle(self, *args, **options):
+        images = Images.objects.order_by('id')
+        if not options['all']:
+            images = images.annotate(total=Count('renditions')).filter(
+                total__lt=len(RENDITION_VARIANTS)
+            )
+        ids = list(images.values_list('id', flat=True))
+        workers = max(settings.BACKGROUND_THREADS, 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(partial(run_task, generate_renditions), ids))
+        self.stdout.write(f'Обработано изображений: {len(ids)}')
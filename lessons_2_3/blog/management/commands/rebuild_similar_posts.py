@@ -0,0 +1,66 @@
+from multiprocessing import Pool
+
+from blog.models import Post, SimilarPost
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models.functions import Mod
+
+
+def rebuild_shard(shard, processes, chunk_size):
+    """Пересчёт связей постов, у которых id % processes == shard."""
+    posts = Post.objects.alias(shard=Mod('id', processes)).filter(shard=shard)
+    last_id, total = 0, 0
+    while True:
+        chunk = list(
+            posts.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return total
+        rows = [
+            SimilarPost(post_id=post_id, similar_id=other, same_tags=same)
+            for post_id in chunk
+            for other, same in SimilarPost.objects.scores_for(post_id)
+        ]
+        with transaction.atomic():
+            SimilarPost.objects.filter(post_id__in=chunk).delete()
+            SimilarPost.objects.bulk_create(rows, batch_size=chunk_size)
+        total += len(rows)
+        last_id = chunk[-1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает таблицу похожих постов. Посты делятся между '
+        'процессами по остатку от деления id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Количество параллельных процессов.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Количество постов, записываемых одной транзакцией.',
+        )
+
+    def handle(self, *args, **options):
+        processes = max(options['processes'], 1)
+        shards = [
+            (shard, processes, options['chunk_size'])
+            for shard in range(processes)
+        ]
+        if processes == 1:
+            totals = [rebuild_shard(*shards[0])]
+        else:
+            # Дочерние процессы не должны наследовать открытые соединения.
+            connections.close_all()
+            with Pool(processes) as pool:
+                totals = pool.starmap(rebuild_shard, shards)
+        self.stdout.write(f'Записано связей: {sum(totals)}')
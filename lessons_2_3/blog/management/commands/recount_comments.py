@@ -0,0 +1,25 @@
+from blog.models import Post
+from blog.utils import published_comments_count, update_in_chunks
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики опубликованных комментариев постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество объектов, обновляемых одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        total = update_in_chunks(
+            Post.objects.all(),
+            options['chunk_size'],
+            comments_count=published_comments_count(),
+        )
+        self.stdout.write(
+            f'{Post._meta.verbose_name_plural}: обновлено {total}'
+        )
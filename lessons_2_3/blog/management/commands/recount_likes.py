@@ -0,0 +1,38 @@
+from blog.models import Comment, Like, Post
+from blog.utils import update_in_chunks
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики лайков постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Количество объектов, обновляемых одним запросом.',
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            content_type = ContentType.objects.get_for_model(model)
+            likes = (
+                Like.objects.filter(
+                    content_type=content_type, object_id=OuterRef('id')
+                )
+                .values('object_id')
+                .annotate(total=Count('id'))
+                .values('total')
+            )
+            total = update_in_chunks(
+                model.objects.all(),
+                options['chunk_size'],
+                likes_count=Coalesce(Subquery(likes), 0),
+            )
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: обновлено {total}'
+            )
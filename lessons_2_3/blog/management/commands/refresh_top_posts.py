@@ -0,0 +1,51 @@
+from blog.models import TOP_PERIOD_LENGTHS, Like, Post, TopPost
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает топ-лист постов за скользящие периоды, '
+        'исключая устаревшие лайки. Лайки не выходят из периодов сами, '
+        'поэтому команду нужно запускать из cron или другого планировщика: '
+        'не реже раза в 10 минут, тогда топ за сутки отстаёт не больше '
+        'чем на 10 минут (*/10 * * * * manage.py refresh_top_posts), и раз '
+        'в сутки с --all для сверки счёта за всё время.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать также счёт за всё время.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for period, length in TOP_PERIOD_LENGTHS.items():
+            scores = (
+                Like.objects.filter(
+                    created__gte=now - length, post__isnull=False
+                )
+                .values('object_id')
+                .annotate(total=Count('id'))
+                .values_list('object_id', 'total')
+            )
+            self.replace(period, scores)
+        if options['all']:
+            scores = Post.objects.filter(likes_count__gt=0).values_list(
+                'id', 'likes_count'
+            )
+            self.replace('all', scores)
+
+    def replace(self, period, scores):
+        """Замена счёта периода новыми значениями."""
+        with transaction.atomic():
+            TopPost.objects.filter(period=period).delete()
+            rows = TopPost.objects.bulk_create(
+                TopPost(post_id=post_id, period=period, likes=likes)
+                for post_id, likes in scores.iterator()
+            )
+        self.stdout.write(f'{period}: {len(rows)}')
@@ -0,0 +1,52 @@
+# Generated by Django 4.1.2 on 2026-10-18 05:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Like = apps.get_model("blog", "Like")
+    for model_name in ("post", "comment"):
+        model = apps.get_model("blog", model_name)
+        content_type = ContentType.objects.filter(
+            app_label="blog", model=model_name
+        ).first()
+        if content_type is None:
+            continue
+        likes = (
+            Like.objects.filter(
+                content_type=content_type, object_id=OuterRef("id")
+            )
+            .values("object_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        model.objects.update(likes_count=Coalesce(Subquery(likes), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0007_alter_images_image"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="likes_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Количество лайков"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Количество лайков"
+            ),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
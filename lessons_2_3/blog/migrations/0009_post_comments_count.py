@@ -0,0 +1,37 @@
+# Generated by Django 4.1.2 on 2026-10-18 05:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comments_count(apps, schema_editor):
+    Comment = apps.get_model("blog", "Comment")
+    Post = apps.get_model("blog", "Post")
+    comments = (
+        Comment.objects.filter(post=OuterRef("id"), status="published")
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Post.objects.update(comments_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0008_likes_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                verbose_name="Количество опубликованных комментариев",
+            ),
+        ),
+        migrations.RunPython(fill_comments_count, migrations.RunPython.noop),
+    ]
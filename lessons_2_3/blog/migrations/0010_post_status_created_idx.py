@@ -0,0 +1,20 @@
+# Generated by Django 4.1.2 on 2026-10-18 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0009_post_comments_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["status", "-created", "-id"],
+                name="post_status_created_idx",
+            ),
+        ),
+    ]
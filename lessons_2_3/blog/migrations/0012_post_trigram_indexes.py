@@ -0,0 +1,32 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:00
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0011_post_search_vector"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="post",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["title"],
+                name="post_title_trgm_idx",
+                opclasses=("gin_trgm_ops",),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["text"],
+                name="post_text_trgm_idx",
+                opclasses=("gin_trgm_ops",),
+            ),
+        ),
+    ]
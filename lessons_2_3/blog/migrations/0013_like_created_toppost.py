@@ -0,0 +1,100 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:10
+
+import datetime
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_top_posts(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    TopPost = apps.get_model("blog", "TopPost")
+    TopPost.objects.bulk_create(
+        TopPost(post_id=post_id, period="all", likes=likes)
+        for post_id, likes in Post.objects.filter(likes_count__gt=0)
+        .values_list("id", "likes_count")
+        .iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0012_post_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="like",
+            name="created",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=datetime.datetime(
+                    1970, 1, 1, tzinfo=datetime.timezone.utc
+                ),
+                verbose_name="Дата",
+            ),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name="TopPost",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[
+                            ("all", "За всё время"),
+                            ("week", "За неделю"),
+                            ("day", "За сутки"),
+                        ],
+                        max_length=10,
+                        verbose_name="Период",
+                    ),
+                ),
+                (
+                    "likes",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Лайки"
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="top_scores",
+                        to="blog.post",
+                        verbose_name="Пост",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Топ поста",
+                "verbose_name_plural": "Топ постов",
+                "ordering": ("period", "-likes"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="toppost",
+            index=models.Index(
+                fields=["period", "-likes", "-post"],
+                name="top_post_period_likes_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="toppost",
+            constraint=models.UniqueConstraint(
+                fields=("post", "period"), name="unique_post_period"
+            ),
+        ),
+        migrations.RunPython(fill_top_posts, migrations.RunPython.noop),
+    ]
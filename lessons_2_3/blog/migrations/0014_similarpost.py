@@ -0,0 +1,67 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0013_like_created_toppost"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimilarPost",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "same_tags",
+                    models.PositiveIntegerField(verbose_name="Общие теги"),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_scores",
+                        to="blog.post",
+                        verbose_name="Пост",
+                    ),
+                ),
+                (
+                    "similar",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_to",
+                        to="blog.post",
+                        verbose_name="Похожий пост",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Похожий пост",
+                "verbose_name_plural": "Похожие посты",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="similarpost",
+            index=models.Index(
+                fields=["post", "-same_tags"],
+                name="similar_post_same_tags_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="similarpost",
+            constraint=models.UniqueConstraint(
+                fields=("post", "similar"), name="unique_post_similar"
+            ),
+        ),
+    ]
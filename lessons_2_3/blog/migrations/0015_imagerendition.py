@@ -0,0 +1,66 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0014_similarpost"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageRendition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "variant",
+                    models.CharField(
+                        choices=[
+                            ("original", "Оригинал"),
+                            ("thumb", "Миниатюра"),
+                        ],
+                        max_length=20,
+                        verbose_name="Вариант",
+                    ),
+                ),
+                (
+                    "file",
+                    models.ImageField(
+                        upload_to="renditions/", verbose_name="Файл"
+                    ),
+                ),
+                ("width", models.PositiveIntegerField(verbose_name="Ширина")),
+                ("height", models.PositiveIntegerField(verbose_name="Высота")),
+                (
+                    "image",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="renditions",
+                        to="blog.images",
+                        verbose_name="Изображение",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Копия изображения",
+                "verbose_name_plural": "Копии изображений",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="imagerendition",
+            constraint=models.UniqueConstraint(
+                fields=("image", "variant"), name="unique_image_variant"
+            ),
+        ),
+    ]
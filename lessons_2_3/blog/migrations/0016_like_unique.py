@@ -0,0 +1,76 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:11
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    """Удаление повторных лайков и пересчёт счётчиков затронутых объектов."""
+    Like = apps.get_model("blog", "Like")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    duplicates = (
+        Like.objects.values("user", "content_type", "object_id")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    touched = set()
+    for row in duplicates.iterator():
+        Like.objects.filter(
+            user=row["user"],
+            content_type=row["content_type"],
+            object_id=row["object_id"],
+        ).exclude(id=row["first_id"]).delete()
+        touched.add((row["content_type"], row["object_id"]))
+    for model_name in ("post", "comment"):
+        content_type = ContentType.objects.filter(
+            app_label="blog", model=model_name
+        ).first()
+        if content_type is None:
+            continue
+        ids = [
+            object_id
+            for type_id, object_id in touched
+            if type_id == content_type.id
+        ]
+        likes = (
+            Like.objects.filter(
+                content_type=content_type, object_id=OuterRef("id")
+            )
+            .order_by()
+            .values("object_id")
+            .annotate(total=Count("id"))
+            .values("total")
+        )
+        apps.get_model("blog", model_name).objects.filter(id__in=ids).update(
+            likes_count=Coalesce(Subquery(likes), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0015_imagerendition"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_likes, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["content_type", "object_id"],
+                include=("user", "created"),
+                name="like_object_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="like",
+            constraint=models.UniqueConstraint(
+                fields=("user", "content_type", "object_id"),
+                name="unique_like",
+            ),
+        ),
+    ]
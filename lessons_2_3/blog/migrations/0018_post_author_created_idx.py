@@ -0,0 +1,20 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0017_timeline"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-created", "-id"],
+                name="post_author_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0018_post_author_created_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["updated", "id"], name="post_updated_idx"
+            ),
+        ),
+    ]
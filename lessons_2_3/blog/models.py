@@ -1,15 +1,37 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.contenttypes.fields import (
     GenericForeignKey,
     GenericRelation,
 )
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from django.db.models import Count
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
 from django.urls import reverse
+from django.utils import timezone
 from taggit.managers import TaggableManager
-from user.models import User
+from taggit.models import TaggedItem
+from user.models import Follow, User
+
+from .cache import bump_post_versions
+from .likes import pending_likes, toggle_buffered
 
 CHOICE_STATUS = (('hidden', 'Hidden'), ('published', 'Published'))
+TOP_PERIODS = (
+    ('all', 'За всё время'),
+    ('week', 'За неделю'),
+    ('day', 'За сутки'),
+)
+TOP_PERIOD_LENGTHS = {'week': timedelta(days=7), 'day': timedelta(days=1)}
+TOP_POSTS_LIMIT = 10
+TIMELINE_BATCH_SIZE = 1000
+TIMELINE_BACKFILL = 20
+RENDITION_VARIANTS = (('original', 'Оригинал'), ('thumb', 'Миниатюра'))
 
 
 class Post(models.Model):
@@ -34,17 +56,50 @@ class Post(models.Model):
         db_index=True,
         verbose_name='Статус',
     )
-    tags = TaggableManager()
+    # Теги поста всегда отдаются по имени, в том числе при prefetch_related
+    tags = TaggableManager(ordering=['name'])
     likes = GenericRelation('Like', related_query_name='post')
+    likes_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество лайков'
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество опубликованных комментариев'
+    )
+    # Заполняется триггером blog_post_search_vector_trigger.
+    search_vector = SearchVectorField(
+        null=True, editable=False, verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         ordering = ('-created',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=('status', '-created', '-id'),
+                name='post_status_created_idx',
+            ),
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='post_author_created_idx',
+            ),
+            models.Index(fields=('updated', 'id'), name='post_updated_idx'),
+            GinIndex(fields=('search_vector',), name='post_search_vector_idx'),
+            GinIndex(
+                fields=('title',),
+                opclasses=('gin_trgm_ops',),
+                name='post_title_trgm_idx',
+            ),
+            GinIndex(
+                fields=('text',),
+                opclasses=('gin_trgm_ops',),
+                name='post_text_trgm_idx',
+            ),
+        ]
 
     @property
     def total_likes(self):
-        return self.likes.count()
+        return self.likes_count + pending_likes(self)
 
     def get_absolute_url(self):
         """Запрос абсолютного адреса объекта."""
@@ -52,7 +107,7 @@ class Post(models.Model):
 
     def get_publish_comments(self):
         """Запрос опубликованных комментариев к объекту."""
-        total = self.post_comments.filter(status='published').count()  # type: ignore # noqa: E501
+        total = self.comments_count
         exists = [11, 12, 13, 14]
         if total % 10 == 1 and total % 100 not in exists:
             return f'{ total} Комментарий'
@@ -67,16 +122,11 @@ class Post(models.Model):
 
     def similar_posts(self):
         """Запрос схожих постов по тегам."""
-        post_tags_ids = self.tags.values_list('id', flat=True)
-        similar_posts = Post.objects.filter(
-            tags__in=post_tags_ids, status='published'
-        ).exclude(
-            id=self.id  # type: ignore
+        return (
+            Post.objects.filter(similar_to__post=self, status='published')
+            .annotate(same_tags=F('similar_to__same_tags'))
+            .order_by('-same_tags', '-created')[:5]
         )
-        similar_posts = similar_posts.annotate(
-            same_tags=Count('tags')
-        ).order_by('-same_tags', '-created')[:5]
-        return similar_posts
 
     def __str__(self) -> str:
         return f'{self.author.username}: {self.title}'
@@ -95,10 +145,58 @@ class Images(models.Model):
         verbose_name = 'Изображение'
         verbose_name_plural = 'Изображения'
 
+    def get_rendition(self, variant='original'):
+        """Готовая копия изображения или None, пока она не создана."""
+        for rendition in self.renditions.all():  # type: ignore
+            if rendition.variant == variant:
+                return rendition
+        return None
+
+    @property
+    def url(self):
+        """Адрес копии изображения, а до её создания - оригинала."""
+        rendition = self.get_rendition()
+        return rendition.file.url if rendition else self.image.url
+
+    @property
+    def srcset(self):
+        """Значение атрибута srcset с копиями для всех допустимых ширин."""
+        return ', '.join(
+            f'{reverse("blog:image", args=[self.id, width])} {width}w'
+            for width in settings.IMAGE_WIDTHS
+        )
+
     def __str__(self):
         return f'{self.post}'
 
 
+class ImageRendition(models.Model):
+    image = models.ForeignKey(
+        Images,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+        verbose_name='Изображение',
+    )
+    variant = models.CharField(
+        max_length=20, choices=RENDITION_VARIANTS, verbose_name='Вариант'
+    )
+    file = models.ImageField(upload_to='renditions/', verbose_name='Файл')
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+
+    class Meta:
+        verbose_name = 'Копия изображения'
+        verbose_name_plural = 'Копии изображений'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['image', 'variant'], name='unique_image_variant'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.image}: {self.variant}'
+
+
 class Comment(models.Model):
     author = models.ForeignKey(
         User,
@@ -127,6 +225,9 @@ class Comment(models.Model):
         verbose_name='Статус',
     )
     likes = GenericRelation('Like', related_query_name='comment')
+    likes_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество лайков'
+    )
 
     class Meta:
         ordering = ('created',)
@@ -135,7 +236,46 @@ class Comment(models.Model):
 
     @property
     def total_likes(self):
-        return self.likes.count()
+        return self.likes_count + pending_likes(self)
+
+    def save(self, *args, **kwargs):
+        """Сохраняет объект и обновляет счётчик комментариев поста."""
+        update_fields = kwargs.get('update_fields')
+        tracked = update_fields is None or {'post', 'status'} & set(
+            update_fields
+        )
+        adding = self._state.adding
+        with transaction.atomic():
+            previous = None
+            if tracked and not adding:
+                previous = (
+                    Comment.objects.select_for_update()
+                    .filter(id=self.id)  # type: ignore
+                    .values_list('post_id', 'status')
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            changes = Counter()
+            if previous is not None and previous[1] == 'published':
+                changes[previous[0]] -= 1
+            if tracked and (adding or previous is not None):
+                if self.status == 'published':
+                    changes[self.post_id] += 1  # type: ignore
+            for post_id, delta in changes.items():
+                if delta:
+                    Post.objects.filter(id=post_id).update(
+                        comments_count=F('comments_count') + delta
+                    )
+
+    def delete(self, *args, **kwargs):
+        """Удаляет объект и обновляет счётчик комментариев поста."""
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if self.status == 'published':
+                Post.objects.filter(id=self.post_id).update(  # type: ignore
+                    comments_count=F('comments_count') - 1
+                )
+        return result
 
     def comment_updated(self):
         """Подтверждение обновления объекта."""
@@ -147,15 +287,70 @@ class Comment(models.Model):
 
 class LikeManager(models.Manager):
     def create_or_delete(self, **kwargs):
-        """Создаёт объект, или удаляет, если таковой уже есть в базе данных."""
+        """Создаёт объект, или удаляет, если таковой уже есть в базе данных.
+
+        Переключение выполняется одним запросом: удаление лайка, а если его
+        не было - вставка с ON CONFLICT DO NOTHING, и обновление счётчика
+        объекта на фактическое число удалённых и вставленных строк.
+        Возвращает кортеж (лайк поставлен, новое количество лайков).
+        При LIKE_BUFFER переключение только записывается в буфер.
+        """
         obj = kwargs.pop('obj')
         user = kwargs.pop('user')
-        like = obj.likes.filter(user=user)
-        if like.exists():
-            like.delete()
-            return False
-        Like.objects.create(user=user, content_object=obj)
-        return True
+        if settings.LIKE_BUFFER:
+            result = toggle_buffered(user, obj)
+        else:
+            result = self.toggle(user, obj)
+        post_id = obj.id if isinstance(obj, Post) else obj.post_id
+        bump_post_versions(
+            post_id, 'body' if isinstance(obj, Post) else 'comments'
+        )
+        return result
+
+    def toggle(self, user, obj):
+        """Переключение лайка в базе данных одним запросом."""
+        content_type = ContentType.objects.get_for_model(obj)
+        like_table = self.model._meta.db_table
+        obj_table = obj._meta.db_table
+        key = [user.id, content_type.id, obj.id]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH deleted AS (
+                    DELETE FROM {like_table}
+                    WHERE user_id = %s AND content_type_id = %s
+                        AND object_id = %s
+                    RETURNING created
+                ), inserted AS (
+                    INSERT INTO {like_table}
+                        (user_id, content_type_id, object_id, created)
+                    SELECT %s, %s, %s, %s
+                    WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                    ON CONFLICT (user_id, content_type_id, object_id)
+                    DO NOTHING
+                    RETURNING created
+                ), counter AS (
+                    UPDATE {obj_table}
+                    SET likes_count = likes_count
+                        + (SELECT count(*) FROM inserted)
+                        - (SELECT count(*) FROM deleted)
+                    WHERE id = %s
+                    RETURNING likes_count
+                )
+                SELECT
+                    NOT EXISTS (SELECT 1 FROM deleted),
+                    (SELECT likes_count FROM counter),
+                    (SELECT created FROM deleted),
+                    (SELECT created FROM inserted)
+                """,
+                key + key + [timezone.now(), obj.id],
+            )
+            liked, count, deleted, inserted = cursor.fetchone()
+            if isinstance(obj, Post) and (deleted or inserted):
+                TopPost.objects.register_likes(
+                    obj.id, [deleted or inserted], -1 if deleted else 1
+                )
+        return liked, count
 
 
 class Like(models.Model):
@@ -165,9 +360,300 @@ class Like(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+    created = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name='Дата'
+    )
     objects = models.Manager()
     likemanager = LikeManager()
 
     class Meta:
         verbose_name = "Лайк"
         verbose_name_plural = "Лайки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'content_type', 'object_id'),
+                name='unique_like',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('content_type', 'object_id'),
+                include=('user', 'created'),
+                name='like_object_idx',
+            )
+        ]
+
+
+class TopPostManager(models.Manager):
+    def register_likes(self, post_id, times, sign):
+        """Учитывает добавленные (sign=1) или удалённые (sign=-1) лайки.
+
+        times - даты создания лайков: лайк меняет счёт только тех периодов,
+        в которые он попадает.
+        """
+        now = timezone.now()
+        deltas = {}
+        for period, _ in TOP_PERIODS:
+            length = TOP_PERIOD_LENGTHS.get(period)
+            total = sum(
+                1 for time in times if length is None or time >= now - length
+            )
+            if total:
+                deltas[period] = sign * total
+        if sign < 0:
+            for period, delta in deltas.items():
+                self.filter(post_id=post_id, period=period).update(
+                    likes=Greatest(F('likes') + delta, 0)
+                )
+        elif deltas:
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            values = ', '.join(['(%s, %s, %s)'] * len(deltas))
+            params = [
+                value
+                for period, delta in deltas.items()
+                for value in (post_id, period, delta)
+            ]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (post_id, period, likes) '
+                    f'VALUES {values} '
+                    'ON CONFLICT (post_id, period) '
+                    f'DO UPDATE SET likes = {table}.likes + EXCLUDED.likes',
+                    params,
+                )
+
+    def top(self, period='all', limit=TOP_POSTS_LIMIT):
+        """Опубликованные посты с наибольшим счётом за период."""
+        return (
+            Post.objects.filter(
+                top_scores__period=period,
+                top_scores__likes__gt=0,
+                status='published',
+            )
+            .select_related('author')
+            .annotate(top=F('top_scores__likes'))
+            .order_by('-top', '-id')[:limit]
+        )
+
+
+class TopPost(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='top_scores',
+        verbose_name='Пост',
+    )
+    period = models.CharField(
+        max_length=10, choices=TOP_PERIODS, verbose_name='Период'
+    )
+    likes = models.PositiveIntegerField(default=0, verbose_name='Лайки')
+    objects = TopPostManager()
+
+    class Meta:
+        ordering = ('period', '-likes')
+        verbose_name = 'Топ поста'
+        verbose_name_plural = 'Топ постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'period'], name='unique_post_period'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('period', '-likes', '-post'),
+                name='top_post_period_likes_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post}: {self.likes}'
+
+
+class SimilarPostManager(models.Manager):
+    def scores_for(self, post_id):
+        """Количество общих тегов поста с каждым из остальных постов."""
+        content_type = ContentType.objects.get_for_model(Post)
+        items = TaggedItem.objects.filter(content_type=content_type)
+        return (
+            items.filter(
+                tag_id__in=items.filter(object_id=post_id).values('tag_id'),
+                object_id__in=Post.objects.values('id'),
+            )
+            .exclude(object_id=post_id)
+            .order_by()
+            .values('object_id')
+            .annotate(same_tags=Count('id'))
+            .values_list('object_id', 'same_tags')
+        )
+
+    def update_for(self, post_id):
+        """Пересчитывает связи поста в обе стороны после смены его тегов."""
+        scores = list(self.scores_for(post_id))
+        rows = [
+            SimilarPost(post_id=post_id, similar_id=other, same_tags=same)
+            for other, same in scores
+        ] + [
+            SimilarPost(post_id=other, similar_id=post_id, same_tags=same)
+            for other, same in scores
+        ]
+        with transaction.atomic():
+            self.filter(
+                models.Q(post_id=post_id) | models.Q(similar_id=post_id)
+            ).delete()
+            self.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=('post_id', 'similar_id'),
+                update_fields=('same_tags',),
+            )
+
+
+class SimilarPost(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='similar_scores',
+        verbose_name='Пост',
+    )
+    similar = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий пост',
+    )
+    same_tags = models.PositiveIntegerField(verbose_name='Общие теги')
+    objects = SimilarPostManager()
+
+    class Meta:
+        verbose_name = 'Похожий пост'
+        verbose_name_plural = 'Похожие посты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'similar'], name='unique_post_similar'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('post', '-same_tags'),
+                name='similar_post_same_tags_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post} ~ {self.similar}: {self.same_tags}'
+
+
+class TimelineManager(models.Manager):
+    def fan_out(self, post_id, batch_size=TIMELINE_BATCH_SIZE, threshold=None):
+        """Добавляет опубликованный пост в ленты подписчиков автора.
+
+        Посты авторов, у которых подписчиков не меньше порога threshold
+        (по умолчанию FEED_FANOUT_THRESHOLD), не рассылаются: лента
+        читает их сама.
+        """
+        if threshold is None:
+            threshold = settings.FEED_FANOUT_THRESHOLD
+        post = (
+            Post.objects.filter(
+                id=post_id,
+                status='published',
+                author__followers_count__lt=threshold,
+            )
+            .values('author_id', 'created')
+            .first()
+        )
+        if post is None:
+            return 0
+        followers = (
+            Follow.objects.filter(author_id=post['author_id'])
+            .values_list('user_id', flat=True)
+            .iterator(chunk_size=batch_size)
+        )
+        total, batch = 0, []
+        for user_id in followers:
+            batch.append(self.model(user_id=user_id, post_id=post_id, **post))
+            if len(batch) == batch_size:
+                total += len(self.bulk_create(batch, ignore_conflicts=True))
+                batch = []
+        if batch:
+            total += len(self.bulk_create(batch, ignore_conflicts=True))
+        return total
+
+    def remove_post(self, post_id):
+        """Убирает скрытый пост из всех лент."""
+        return self.filter(post_id=post_id).delete()[0]
+
+    def follow(self, user_id, author_id, limit=TIMELINE_BACKFILL):
+        """Добавляет в ленту подписчика последние посты автора."""
+        posts = Post.objects.filter(
+            author_id=author_id, status='published'
+        ).values_list('id', 'created')[:limit]
+        return len(
+            self.bulk_create(
+                [
+                    self.model(
+                        user_id=user_id,
+                        post_id=post_id,
+                        author_id=author_id,
+                        created=created,
+                    )
+                    for post_id, created in posts
+                ],
+                ignore_conflicts=True,
+            )
+        )
+
+    def unfollow(self, user_id, author_id):
+        """Убирает посты автора из ленты отписавшегося пользователя."""
+        return self.filter(user_id=user_id, author_id=author_id).delete()[0]
+
+
+class Timeline(models.Model):
+    """Лента подписок: строка на пару (подписчик, пост автора).
+
+    Строки создаются при публикации поста, поэтому чтение ленты - это
+    один проход по индексу (user, -created, -post) без соединения
+    подписок с постами.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    created = models.DateTimeField(verbose_name='Дата публикации')
+    objects = TimelineManager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_user_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-created', '-post'),
+                name='timeline_user_created_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'), name='timeline_user_author_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.post}'
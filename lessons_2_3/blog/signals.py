@@ -0,0 +1,123 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+from taggit.models import Tag, TaggedItem
+
+from .cache import bump_post_versions, bump_versions, list_version_key
+from .models import (
+    Comment,
+    ImageRendition,
+    Images,
+    Like,
+    Post,
+    SimilarPost,
+    Timeline,
+)
+from .tasks import run_on_commit
+from .utils import generate_renditions
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def update_similar_posts(sender, instance, action, pk_set, **kwargs):
+    """Пересчёт похожих постов после изменения тегов поста."""
+    if not isinstance(instance, Post):
+        return
+    if action == 'post_clear' or (
+        action in ('post_add', 'post_remove') and pk_set
+    ):
+        SimilarPost.objects.update_for(instance.id)  # type: ignore
+
+
+@receiver(m2m_changed, sender=TaggedItem)
+def invalidate_tag_lists(sender, instance, action, pk_set, **kwargs):
+    """Сброс списков постов по тегам, добавленным посту или снятым с него."""
+    if not isinstance(instance, Post):
+        return
+    if action == 'pre_clear':
+        slugs = list(instance.tags.slugs())
+    elif action in ('post_add', 'post_remove') and pk_set:
+        slugs = Tag.objects.filter(pk__in=pk_set).values_list(
+            'slug', flat=True
+        )
+    else:
+        return
+    bump_versions(
+        list_version_key(), *(list_version_key(slug) for slug in slugs)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def invalidate_post_lists(sender, instance, **kwargs):
+    """Сброс главной страницы и страниц тегов поста после его изменения."""
+    bump_versions(
+        list_version_key(),
+        *(list_version_key(slug) for slug in instance.tags.slugs()),
+    )
+
+
+@receiver(post_save, sender=Post)
+def remove_hidden_post(sender, instance, **kwargs):
+    """Удаление скрытого поста из лент подписчиков в фоне."""
+    if instance.status == 'hidden':
+        run_on_commit(Timeline.objects.remove_post, instance.id)
+
+
+@receiver(post_save, sender=Images)
+def schedule_renditions(sender, instance, **kwargs):
+    """Создание копий изображения в фоне после его загрузки."""
+    run_on_commit(generate_renditions, instance.id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    """Сброс кэша страницы поста после его изменения."""
+    bump_post_versions(instance.id, 'body')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_comments(sender, instance, **kwargs):
+    """Сброс комментариев и их счётчика на странице поста."""
+    bump_post_versions(instance.post_id)
+
+
+@receiver(post_save, sender=Images)
+@receiver(post_delete, sender=Images)
+def invalidate_post_images(sender, instance, **kwargs):
+    """Сброс изображений на странице поста."""
+    bump_post_versions(instance.post_id, 'body')
+
+
+@receiver(post_save, sender=ImageRendition)
+def invalidate_post_renditions(sender, instance, **kwargs):
+    """Сброс страницы поста после создания копии изображения."""
+    post_id = (
+        Images.objects.filter(id=instance.image_id)
+        .values_list('post_id', flat=True)
+        .first()
+    )
+    if post_id is not None:
+        bump_post_versions(post_id, 'body')
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_post_likes(sender, instance, **kwargs):
+    """Сброс счётчика лайков поста или комментария на странице поста."""
+    if instance.content_type_id == ContentType.objects.get_for_model(Post).id:
+        bump_post_versions(instance.object_id, 'body')
+        return
+    post_id = (
+        Comment.objects.filter(id=instance.object_id)
+        .values_list('post_id', flat=True)
+        .first()
+    )
+    if post_id is not None:
+        bump_post_versions(post_id, 'comments')
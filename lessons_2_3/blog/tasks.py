@@ -0,0 +1,63 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(executor_class, workers):
+    """Общий для процесса пул воркеров заданного типа."""
+    key = (executor_class, workers)
+    with _executors_lock:
+        if key not in _executors:
+            _executors[key] = executor_class(max_workers=workers)
+        return _executors[key]
+
+
+def run_task(func, *args):
+    """Выполнение задачи в потоке пула с закрытием соединения с базой."""
+    try:
+        return func(*args)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', func.__name__)
+        raise
+    finally:
+        connection.close()
+
+
+def run_in_thread(func, *args):
+    """Запуск задачи, работающей с базой данных, в пуле потоков.
+
+    При BACKGROUND_THREADS = 0 задача выполняется сразу.
+    """
+    workers = settings.BACKGROUND_THREADS
+    if not workers:
+        return func(*args)
+    return get_executor(ThreadPoolExecutor, workers).submit(
+        run_task, func, *args
+    )
+
+
+def run_in_process(func, *args):
+    """Выполнение ресурсоёмкой функции в пуле процессов.
+
+    Функция не должна обращаться к базе данных. Вызывающий поток ждёт
+    результат; при BACKGROUND_PROCESSES = 0 функция выполняется на месте.
+    """
+    workers = settings.BACKGROUND_PROCESSES
+    if not workers:
+        return func(*args)
+    return (
+        get_executor(ProcessPoolExecutor, workers).submit(func, *args).result()
+    )
+
+
+def run_on_commit(func, *args):
+    """Запуск задачи в пуле потоков после фиксации текущей транзакции."""
+    transaction.on_commit(lambda: run_in_thread(func, *args))
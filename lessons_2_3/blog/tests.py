@@ -1,13 +1,34 @@
+import os
+import shutil
+import tempfile
+import time
 from datetime import timedelta
-
-from django.db.models import Count
-from django.test import Client, TestCase
+from io import BytesIO, StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import (
+    AsyncRequestFactory,
+    Client,
+    TestCase,
+    override_settings,
+)
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 from rest_framework import status
 from user.models import User
 
+from .cache import page_key
 from .forms import CommentCreateForm, PostCreateForm
-from .models import Comment, Images, Like, Post
+from .models import Comment, Images, Like, Post, SimilarPost, Timeline
+from .utils import assemble_feed, flush_like_buffer, sync_tags
+from .views import LikeCommentAsyncView, LikePostAsyncView
 
 
 class TestBlogApp(TestCase):
@@ -48,6 +69,7 @@ class TestBlogApp(TestCase):
 
     def setUp(self):
         """Создание клиентов на уровне теста."""
+        cache.clear()
         self.user = Client()
         self.other = Client()
         self.user.force_login(self.u)
@@ -75,6 +97,41 @@ class TestBlogApp(TestCase):
         )
         self.assertTemplateUsed(response_user, 'home.html')
 
+    def test_index_page_cache(self):
+        """Кэш главной страницы для анонимных посетителей."""
+        url = reverse('blog:index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # После публикации поста устаревший ответ отдаётся, пока страница
+        # перестраивается другим запросом
+        Post.objects.create(author=self.u, title='New', text='New post')
+        key = f'{page_key("index")}:lock'
+        cache.add(key, 1)
+        with self.assertNumQueries(0):
+            self.client.get(url, {'utm_source': 'mail'})
+        # Без ответа в кэше запрос ждёт запрос с блокировкой, а по
+        # истечении ожидания строит страницу сам
+        cache.delete(page_key('index'))
+        with override_settings(PAGE_CACHE_WAIT_TIMEOUT=0.1):
+            start = time.monotonic()
+            response = self.client.get(url)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        cache.delete(key)
+        self.assertIn(
+            'New', [post.title for post in response.context['posts']]
+        )
+        # Страница тега сбрасывается при добавлении тега посту
+        url = reverse('blog:post_list_by_tags', kwargs={'tag': 'post'})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        post = Post.objects.get(title='New')
+        post.tags.add('post')
+        response = self.client.get(url)
+        self.assertIn(post, response.context['posts'])
+
     def test_home_user_page(self):
         """Тест домашней страницы пользователя."""
         url = reverse('blog:home', kwargs={'username': self.u.username})
@@ -153,13 +210,179 @@ class TestBlogApp(TestCase):
         tests_response(response_client)
         tests_response(response_user)
 
+    @override_settings(BACKGROUND_THREADS=0, BACKGROUND_PROCESSES=0)
     def test_img_of_the_post(self):
         """Тест конвертации изображения."""
         url = reverse('blog:post_detail', kwargs={'pk': self.p.id})  # type: ignore # noqa: E501
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         for image in response.context['images']:
-            self.assertRegex(image.name, r'.webp')
+            self.assertEqual(image.url, image.image.url)
+        with tempfile.TemporaryDirectory() as media_root:
+            shutil.copytree(
+                settings.MEDIA_ROOT / 'images', Path(media_root) / 'images'
+            )
+            with self.settings(MEDIA_ROOT=media_root):
+                with self.captureOnCommitCallbacks(execute=True):
+                    image = Images.objects.create(
+                        post=self.p, image='images/img.jpg'
+                    )
+                thumb = image.get_rendition('thumb')
+                self.assertEqual((thumb.width, thumb.height), (640, 360))
+                self.assertEqual(image.get_rendition().width, 1600)
+                response = self.user.get(url)
+                image = next(
+                    i for i in response.context['images'] if i == image
+                )
+                self.assertRegex(image.url, r'^/media/renditions/.*\.webp$')
+                copy = image.get_rendition().file.name
+                self.assertTrue((Path(media_root) / copy).exists())
+
+    @override_settings(BACKGROUND_PROCESSES=0, IMAGE_CACHE_MAX_BYTES=1)
+    def test_image_widths(self):
+        """Копии изображения по ширине, ETag и вытеснение из кэша."""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with self.settings(IMAGE_CACHE_DIR=cache_dir):
+                image = self.img[0]
+                self.assertIn(f'/image/{image.id}/640/ 640w', image.srcset)
+                url = reverse('blog:image', args=[image.id, 320])
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(response['Content-Type'], 'image/webp')
+                etag = response['ETag']
+                with Image.open(BytesIO(b''.join(response))) as copy:
+                    self.assertEqual(copy.size, (320, 180))
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, status.HTTP_304_NOT_MODIFIED
+                )
+                response = self.client.get(
+                    reverse('blog:image', args=[image.id, 640])
+                )
+                b''.join(response)
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+                response = self.client.get(
+                    reverse('blog:image', args=[image.id, 100])
+                )
+                self.assertEqual(
+                    response.status_code, status.HTTP_404_NOT_FOUND
+                )
+
+    def test_post_detail_cache(self):
+        """Страница поста из кэша и её сброс при изменении данных."""
+        url = reverse('blog:post_detail', kwargs={'pk': self.p.id})  # type: ignore # noqa: E501
+        comments_count = self.client.get(url).context['post'].comments_count
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.context['post'], self.p)
+        comment = Comment.objects.create(
+            author=self.o, post=self.p, text='New comment', status='published'
+        )
+        response = self.client.get(url)
+        self.assertIn(comment, response.context['comments'])
+        self.assertEqual(
+            response.context['post'].comments_count, comments_count + 1
+        )
+        Like.likemanager.create_or_delete(obj=self.p, user=self.o)
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].likes_count, 1)
+        self.p.title = 'Cached title'
+        self.p.save()
+        response = self.client.get(url)
+        self.assertEqual(response.context['post'].title, 'Cached title')
+
+    def test_post_detail_conditional_get(self):
+        """Ответ 304 на неизменённую страницу поста."""
+        url = reverse('blog:post_detail', kwargs={'pk': self.p.id})  # type: ignore # noqa: E501
+        response = self.client.get(url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        response = self.user.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        Comment.objects.create(author=self.o, post=self.p, text='New')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(BACKGROUND_THREADS=0)
+    def test_feed(self):
+        """Лента подписок: рассылка поста, скрытие и отписка."""
+        url = reverse('blog:feed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.get(reverse('user:follow', kwargs={'pk': self.o.id}))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.post(
+                reverse('blog:post_create'),
+                {'title': 'Feed post', 'text': 'Text', 'tags': 'feed'},
+            )
+        post = Post.objects.get(title='Feed post')
+        response = self.user.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.context['posts']), [post])
+        self.assertFalse(Timeline.objects.filter(user=self.o).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.get(reverse('blog:post_delete', kwargs={'pk': post.id}))
+        self.assertFalse(self.user.get(url).context['posts'])
+        old_post = Post.objects.create(author=self.o, title='Old', text='Old')
+        follow_url = reverse('user:follow', kwargs={'pk': self.o.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.get(follow_url)
+        self.assertFalse(Timeline.objects.filter(user=self.u).exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.get(follow_url)
+        self.assertEqual(list(self.user.get(url).context['posts']), [old_post])
+
+    @override_settings(BACKGROUND_THREADS=0, FEED_FANOUT_THRESHOLD=2)
+    def test_hybrid_feed(self):
+        """Лента из Timeline и постов авторов с большим числом подписчиков."""
+        reader = User.objects.create_user(
+            username='reader',
+            email='reader@mail.ru',
+            password='reader12',
+            is_active=True,
+        )
+        client = Client()
+        client.force_login(reader)
+        for user_client, author in (
+            (self.user, self.o),
+            (client, self.o),
+            (client, self.u),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                user_client.get(
+                    reverse('user:follow', kwargs={'pk': author.id})
+                )
+        self.o.refresh_from_db()
+        self.assertEqual(self.o.followers_count, 2)
+        posts = []
+        for number, user_client in enumerate(
+            (self.other, self.user, self.other)
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                user_client.post(
+                    reverse('blog:post_create'),
+                    {
+                        'title': f'Hybrid {number}',
+                        'text': 'Text',
+                        'tags': 'hybrid',
+                    },
+                )
+            posts.append(Post.objects.get(title=f'Hybrid {number}'))
+        self.assertEqual(
+            list(Timeline.objects.filter(user=reader, post__in=posts)),
+            list(Timeline.objects.filter(user=reader, post=posts[1])),
+        )
+        feed, cursor = [], None
+        while True:
+            page = assemble_feed(reader, cursor, per_page=1)
+            feed += page.object_list
+            if not page.has_next():
+                break
+            cursor = page.next_page_number()
+        self.assertEqual(feed[:3], posts[::-1])
 
     def test_post_update(self):
         """Обновление поста."""
@@ -200,6 +423,7 @@ class TestBlogApp(TestCase):
         self.assertTemplateUsed(response_author_post, 'post/post_detail.html')
         self.assertEqual(Post.objects.all().count(), posts)
         self.assertEqual(self.p.title, 'Update title')
+        self.assertEqual(list(self.p.tags.names()), ['updated'])  # type: ignore # noqa: E501
         # POST request of other authenticated user
         self.assertEqual(response_other_post.status_code, status.HTTP_200_OK)
         self.assertTemplateUsed(response_other_post, 'post/post_update.html')
@@ -268,6 +492,36 @@ class TestBlogApp(TestCase):
         tests_response(response_client)
         tests_response(response_user)
 
+    def test_cursor_pagination(self):
+        """Тест курсорной пагинации постов."""
+        url = reverse('blog:home', kwargs={'username': self.o.username})
+        posts = [
+            Post.objects.create(author=self.o, title=f'{i}', text='text')
+            for i in range(7)
+        ]
+        posts.reverse()
+        first = self.user.get(url).context['posts']
+        self.assertEqual(list(first), posts[:3])
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        second = self.user.get(
+            url, {'page': first.next_page_number()}
+        ).context['posts']
+        self.assertEqual(list(second), posts[3:6])
+        self.assertTrue(second.has_previous())
+        third = self.user.get(
+            url, {'page': second.next_page_number()}
+        ).context['posts']
+        self.assertEqual(list(third), posts[6:])
+        self.assertFalse(third.has_next())
+        back = self.user.get(
+            url, {'page': second.previous_page_number()}
+        ).context['posts']
+        self.assertEqual(list(back), posts[:3])
+        self.assertFalse(back.has_previous())
+        invalid = self.user.get(url, {'page': 'broken'}).context['posts']
+        self.assertEqual(list(invalid), posts[:3])
+
     def test_comment_create(self):
         """Создание комментария."""
         url = reverse('blog:comment_create', kwargs={'pk': self.p.id})  # type: ignore # noqa: E501
@@ -361,6 +615,9 @@ class TestBlogApp(TestCase):
         # Response of authenticated author
         self.assertEqual(response_author.status_code, status.HTTP_200_OK)
         self.assertTrue(comment_author.status == 'hidden')
+        self.assertEqual(
+            Post.objects.get(id=self.p.id).comments_count, 0  # type: ignore # noqa: E501
+        )
         self.assertRedirects(
             response_author,
             reverse('blog:post_detail', kwargs={'pk': self.p.id}),  # type: ignore # noqa: E501
@@ -391,15 +648,35 @@ class TestBlogApp(TestCase):
         self.assertIn(self.p, response_user.context['posts'])
         self.assertTemplateUsed(response_user, 'post/search_post.html')
 
+    def test_search_post_ranking(self):
+        """Тест ранжирования и подсветки результатов поиска."""
+        url = reverse('blog:search_post')
+        Post.objects.create(
+            author=self.o, title='Обычная запись', text='Про котов и собак'
+        )
+        Post.objects.create(
+            author=self.o, title='коты', text='Текст без совпадений'
+        )
+        response = self.user.get(url, {'search': 'кот'})
+        posts = response.context['posts']
+        self.assertEqual(
+            [post.title for post in posts], ['коты', 'Обычная запись']
+        )
+        self.assertIn('<mark>котов</mark>', posts[1].snippet)
+        response = self.user.get(url, {'search': self.o.username})
+        self.assertEqual(len(response.context['posts']), 2)
+
     def test_like_for_post(self):
         """Тест системы лайков к посту."""
         url = reverse('blog:like_for_post', kwargs={'pk': self.p.id})  # type: ignore # noqa: E501
         likes = self.p.total_likes
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.p.refresh_from_db()
         self.assertEqual(self.p.total_likes, likes + 1)
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.p.refresh_from_db()
         self.assertEqual(self.p.total_likes, likes)
 
     def test_like_for_comment(self):
@@ -408,20 +685,126 @@ class TestBlogApp(TestCase):
         likes = self.c.total_likes
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.c.refresh_from_db()
         self.assertEqual(self.c.total_likes, likes + 1)
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.c.refresh_from_db()
         self.assertEqual(self.c.total_likes, likes)
 
+    def test_like_toggle(self):
+        """Переключение лайка одним запросом и уникальность лайка."""
+        ContentType.objects.get_for_model(Comment)
+        # SAVEPOINT, запрос переключения и RELEASE SAVEPOINT
+        with self.assertNumQueries(3):
+            result = Like.likemanager.create_or_delete(obj=self.c, user=self.o)
+        self.assertEqual(result, (True, self.c.likes_count + 1))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Like.objects.create(user=self.o, content_object=self.c)
+        result = Like.likemanager.create_or_delete(obj=self.c, user=self.o)
+        self.assertEqual(result, (False, self.c.likes_count))
+        self.assertFalse(self.c.likes.exists())
+
+    async def test_like_async(self):
+        """Асинхронные представления лайков к посту и комменту."""
+        factory = AsyncRequestFactory()
+        for view, obj in (
+            (LikePostAsyncView, self.p),
+            (LikeCommentAsyncView, self.c),
+        ):
+            request = factory.get('/')
+            request.user = self.o
+            response = await view(request, pk=obj.id)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertTrue(await obj.likes.filter(user=self.o).aexists())
+            response = await view(request, pk=obj.id)
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+            self.assertFalse(await obj.likes.filter(user=self.o).aexists())
+        request = factory.get('/like_post/')
+        request.user = AnonymousUser()
+        response = await LikePostAsyncView(request, pk=self.p.id)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertIn(reverse('login'), response.url)
+
+    @override_settings(LIKE_BUFFER=True)
+    def test_like_buffer(self):
+        """Буфер лайков: переключения видны сразу и пишутся пачкой."""
+        url = reverse('blog:like_for_post', kwargs={'pk': self.p.id})  # type: ignore # noqa: E501
+        likes = self.p.likes_count
+        response = self.user.get(url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        for _ in range(3):
+            self.other.get(url)
+        self.assertFalse(self.p.likes.exists())
+        self.assertEqual(self.p.total_likes, likes + 2)
+        # Первый вызов выводит поколение из оборота, второй - записывает
+        self.assertEqual(flush_like_buffer(), (0, 0))
+        response = self.user.get(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(flush_like_buffer(), (2, 0))
+        self.p.refresh_from_db()
+        self.assertEqual(self.p.likes_count, likes + 2)
+        self.assertEqual(self.p.total_likes, likes + 1)
+        self.assertEqual(flush_like_buffer(), (0, 1))
+        self.p.refresh_from_db()
+        self.assertEqual(self.p.total_likes, likes + 1)
+        self.assertEqual(
+            list(self.p.likes.values_list('user', flat=True)), [self.o.id]
+        )
+
+    def test_recount_likes(self):
+        """Тест пересчёта счётчиков лайков."""
+        Like.objects.create(user=self.u, content_object=self.p)
+        Like.objects.create(user=self.o, content_object=self.p)
+        Like.objects.create(user=self.o, content_object=self.c)
+        Post.objects.filter(id=self.sim_p.id).update(likes_count=5)  # type: ignore # noqa: E501
+        call_command('recount_likes', chunk_size=1, stdout=StringIO())
+        self.p.refresh_from_db()
+        self.c.refresh_from_db()
+        self.sim_p.refresh_from_db()
+        self.assertEqual(self.p.total_likes, 2)
+        self.assertEqual(self.c.total_likes, 1)
+        self.assertEqual(self.sim_p.total_likes, 0)
+
+    def test_recount_comments(self):
+        """Тест пересчёта счётчиков опубликованных комментариев."""
+        Post.objects.update(comments_count=7)
+        call_command('recount_comments', chunk_size=1, stdout=StringIO())
+        self.p.refresh_from_db()
+        self.sim_p.refresh_from_db()
+        self.assertEqual(self.p.comments_count, 1)
+        self.assertEqual(self.sim_p.comments_count, 0)
+
     def test_top_posts(self):
         """Тест запроса на самые популярные посты."""
         url = reverse('blog:top_posts')
-        Like.objects.create(user=self.u, content_object=self.sim_p)
-        top = Post.objects.annotate(top=Count('likes')).order_by('-top')
+        Like.likemanager.create_or_delete(user=self.u, obj=self.sim_p)
+        Like.likemanager.create_or_delete(user=self.o, obj=self.sim_p)
+        Like.likemanager.create_or_delete(user=self.u, obj=self.p)
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertQuerysetEqual(response.context['top'], top)
+        self.assertEqual(list(response.context['top']), [self.sim_p, self.p])
+        self.assertEqual(
+            [post.top for post in response.context['top']], [2, 1]
+        )
         self.assertTemplateUsed(response, 'index.html')
+        # После пересчёта старые лайки выходят из скользящих периодов
+        Like.objects.filter(user=self.o).update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        call_command('refresh_top_posts', stdout=StringIO())
+        response = self.user.get(url, {'period': 'day'})
+        self.assertEqual(
+            [(post, post.top) for post in response.context['top']],
+            [(self.sim_p, 1), (self.p, 1)],
+        )
+        response = self.user.get(url, {'period': 'week'})
+        self.assertEqual(response.context['top'][0].top, 2)
+        # Снятый лайк и скрытый пост
+        Like.likemanager.create_or_delete(user=self.u, obj=self.p)
+        Post.objects.filter(id=self.sim_p.id).update(status='hidden')  # type: ignore # noqa: E501
+        response = self.user.get(url, {'period': 'day'})
+        self.assertEqual(list(response.context['top']), [])
 
     def test_method_get_absolute_url(self):
         """Тест запроса абсолютного адреса объекта модели Post."""
@@ -435,14 +818,28 @@ class TestBlogApp(TestCase):
         answer = '0 Комментариев'
         self.assertEqual(post.get_publish_comments(), answer)
 
-        Comment.objects.create(author=self.u, post=post, text='comment')
+        comment = Comment.objects.create(
+            author=self.u, post=post, text='comment'
+        )
+        post.refresh_from_db()
         answer = '1 Комментарий'
         self.assertEqual(post.get_publish_comments(), answer)
 
         Comment.objects.create(author=self.u, post=post, text='comment')
+        post.refresh_from_db()
         answer = '2 Комментария'
         self.assertEqual(post.get_publish_comments(), answer)
 
+        comment.status = 'hidden'
+        comment.save(update_fields=['status'])
+        post.refresh_from_db()
+        answer = '1 Комментарий'
+        self.assertEqual(post.get_publish_comments(), answer)
+
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
     def test_method_post_updated(self):
         """Тест запроса подтверждения обновления объекта модели Post."""
         post = Post.objects.create(
@@ -458,6 +855,34 @@ class TestBlogApp(TestCase):
     def test_method_similar_posts(self):
         """Тест запроса похожих постов по тегам."""
         self.assertEqual(self.p.similar_posts()[0], self.sim_p)
+        other = Post.objects.create(author=self.o, title='other', text='t')
+        other.tags.add('post', 'other')
+        self.sim_p.tags.add('other')
+        self.assertEqual(list(self.p.similar_posts()), [other, self.sim_p])
+        self.assertEqual(self.sim_p.similar_posts()[0].same_tags, 2)
+        other.tags.clear()
+        self.assertEqual(list(self.p.similar_posts()), [self.sim_p])
+        self.assertEqual(list(other.similar_posts()), [])
+
+    def test_sync_tags(self):
+        """Тест синхронизации тегов поста по разнице наборов."""
+        ContentType.objects.get_for_model(Post)
+        with self.assertNumQueries(1):
+            self.assertFalse(sync_tags(self.p, ['post']))
+        self.assertTrue(sync_tags(self.p, ['post', 'new', 'other']))
+        self.assertTrue(sync_tags(self.p, ['new', 'other']))
+        self.assertEqual(
+            sorted(self.p.tags.names()), ['new', 'other']  # type: ignore
+        )
+        self.assertEqual(list(self.p.similar_posts()), [])
+        self.assertEqual(list(self.sim_p.similar_posts()), [])
+
+    def test_rebuild_similar_posts(self):
+        """Тест полного пересчёта похожих постов."""
+        SimilarPost.objects.all().delete()
+        call_command('rebuild_similar_posts', chunk_size=1, stdout=StringIO())
+        self.assertEqual(list(self.p.similar_posts()), [self.sim_p])
+        self.assertEqual(list(self.sim_p.similar_posts()), [self.p])
 
     def test_method__str__(self):
         """Тест запроса строчной информации об объекте модели Post."""
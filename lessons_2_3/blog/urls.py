@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -7,6 +8,7 @@ app_name = 'blog'
 urlpatterns = [
     path('', views.index, name='index'),
     path('blog/<str:username>/', views.UserPostListView, name='home'),
+    path('feed/', views.FeedView, name='feed'),
     path('tag/<str:tag>/', views.PostTagListView, name='post_list_by_tags'),
     path('create/', views.PostCreateView, name='post_create'),
     path(
@@ -28,11 +30,20 @@ urlpatterns = [
         name='comment_delete',
     ),
     path('search/', views.SearchPostView, name='search_post'),
-    path('like_post/<int:pk>/', views.LikePostView, name='like_for_post'),
+    path(
+        'like_post/<int:pk>/',
+        views.LikePostAsyncView
+        if settings.ASYNC_VIEWS
+        else views.LikePostView,
+        name='like_for_post',
+    ),
     path(
         'like_comment/<int:pk>/',
-        views.LikeCommentView,
+        views.LikeCommentAsyncView
+        if settings.ASYNC_VIEWS
+        else views.LikeCommentView,
         name='like_for_comment',
     ),
     path('top/', views.TopPostsView, name='top_posts'),
+    path('image/<int:pk>/<int:width>/', views.ImageView, name='image'),
 ]
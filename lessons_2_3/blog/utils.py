@@ -1,36 +1,614 @@
-import io
+import base64
+import hashlib
+import heapq
+import json
+import os
+import uuid
+from collections import Counter, defaultdict
+from functools import wraps
 from pathlib import Path
 
-from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.utils import timezone
 from PIL import Image
+from taggit.models import Tag, TaggedItem
+from user.models import Follow
+
+from .cache import bump_post_versions, bump_versions, list_version_key
+from .likes import (
+    FLUSH_LOCK_KEY,
+    FLUSH_LOCK_TIMEOUT,
+    FLUSHED_KEY,
+    GENERATION_KEY,
+    buffer_cache,
+    delta_key,
+    event_key,
+    pending_generations,
+    sequence_key,
+    state_key,
+)
+from .models import (
+    Comment,
+    ImageRendition,
+    Images,
+    Like,
+    Post,
+    SimilarPost,
+    Timeline,
+    TopPost,
+)
+from .tasks import run_in_process
+
+# Ширина (None - без уменьшения) и качество webp для вариантов копий.
+RENDITIONS = {'original': (None, 95), 'thumb': (640, 80)}
+# Качество webp для копий, создаваемых по запросу.
+IMAGE_CACHE_QUALITY = 80
+
+
+class CursorPage:
+    """Страница курсорной пагинации.
+
+    Повторяет интерфейс django.core.paginator.Page, используемый в шаблонах:
+    next_page_number() и previous_page_number() возвращают курсоры.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage: {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+
+class CursorPaginator:
+    """Пагинатор по ключу сортировки без COUNT(*) и OFFSET.
+
+    Каждая страница выбирается условием по значениям ключа последнего
+    объекта предыдущей страницы, поэтому стоимость запроса не зависит
+    от номера страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-created', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+
+    def encode_cursor(self, obj, reverse=False):
+        """Непрозрачный курсор на позицию объекта или строки .values()."""
+        model = self.object_list.model
+        fields = [
+            model._meta.get_field(name.lstrip('-')) for name in self.ordering
+        ]
+        if isinstance(obj, dict):
+            obj = model(**{field.attname: obj[field.name] for field in fields})
+        values = [field.value_to_string(obj) for field in fields]
+        data = json.dumps([values, reverse])
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Разбор курсора, None при некорректном значении."""
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            data = base64.urlsafe_b64decode(cursor + padding)
+            values, reverse = json.loads(data)
+            model = self.object_list.model
+            values = [
+                model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, values, strict=True)
+            ]
+        except (TypeError, ValueError, ValidationError, FieldDoesNotExist):
+            return None
+        return values, bool(reverse)
+
+    def keyset_filter(self, values, reverse=False):
+        """Условие "после позиции курсора" в порядке сортировки."""
+        condition = Q()
+        for index, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') != reverse else 'gt'
+            prefix = {
+                key.lstrip('-'): value
+                for key, value in zip(self.ordering[:index], values)
+            }
+            condition |= Q(**prefix, **{f'{field}__{lookup}': values[index]})
+        return condition
+
+    def page(self, cursor=None):
+        """Страница после (или перед) позицией курсора."""
+        position = self.decode_cursor(cursor) if cursor else None
+        reverse = position is not None and position[1]
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                name[1:] if name.startswith('-') else f'-{name}'
+                for name in ordering
+            )
+        queryset = self.object_list
+        if position is not None:
+            queryset = queryset.filter(
+                self.keyset_filter(position[0], reverse)
+            )
+        objs = list(queryset.order_by(*ordering)[: self.per_page + 1])
+        has_more = len(objs) > self.per_page
+        objs = objs[: self.per_page]
+        if reverse:
+            objs.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        next_cursor = previous_cursor = None
+        if objs and has_next:
+            next_cursor = self.encode_cursor(objs[-1])
+        if objs and has_previous:
+            previous_cursor = self.encode_cursor(objs[0], reverse=True)
+        return CursorPage(objs, self, next_cursor, previous_cursor)
 
 
 def pagination(request, obj_list, count_obj):
-    """Функция-пагинатор."""
-    paginator = Paginator(obj_list, count_obj)
+    """Функция-пагинатор.
+
+    Параметр page содержит курсор, выданный предыдущей страницей.
+    """
     page = request.GET.get('page')
-    try:
-        objs = paginator.page(page)
-    except PageNotAnInteger:
-        objs = paginator.page(1)
-    except EmptyPage:
-        objs = paginator.page(paginator.num_pages)
+    objs = CursorPaginator(obj_list, count_obj).page(page)
     return (objs, page)
 
 
-def converter(obj):
-    """Функция конвертации формата изображений в webp."""
-    new_file_name = str(Path(obj.name).with_suffix('.webp'))
-    image = Image.open(obj.file)
-    thumb_io = io.BytesIO()
-    image.save(thumb_io, 'webp', optimize=True, quality=95)
-    new_obj = InMemoryUploadedFile(
-        thumb_io,
-        obj.name,
-        new_file_name,
-        size=obj.size,
-        charset='utf-8',
-        content_type='image/jpeg',
+def alogin_required(login_url=None):
+    """login_required для асинхронных представлений.
+
+    Пользователь сессии загружается в потоке для синхронного кода, после
+    чего request.user можно читать в асинхронном представлении.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if await sync_to_async(lambda: request.user.is_authenticated)():
+                return await view(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path(), login_url)
+
+        return wrapper
+
+    return decorator
+
+
+async def aget_object_or_404(model, **kwargs):
+    """Асинхронный вариант get_object_or_404 на QuerySet.aget()."""
+    try:
+        return await model._default_manager.aget(**kwargs)
+    except model.DoesNotExist:
+        raise Http404(f'{model._meta.object_name} не найден')
+
+
+def assemble_feed(user, cursor=None, per_page=10, threshold=None):
+    """Страница ленты подписок пользователя.
+
+    Посты обычных авторов берутся из заранее заполненной таблицы Timeline,
+    посты авторов с числом подписчиков от threshold (по умолчанию
+    FEED_FANOUT_THRESHOLD) - из их собственных постов. Потоки уже
+    отсортированы по (created, id) и сливаются k-путевым слиянием. Курсор
+    общий для всех потоков, поэтому лента листается только вперёд.
+    """
+    timeline = CursorPaginator(
+        Timeline.objects.filter(user=user).select_related('post__author'),
+        per_page,
+        ('-created', '-post'),
+    )
+    position = timeline.decode_cursor(cursor) if cursor else None
+    if position is None or position[1]:
+        cursor = None
+    page = timeline.page(cursor)
+    streams = [[entry.post for entry in page]]
+    has_more = page.has_next()
+    if threshold is None:
+        threshold = settings.FEED_FANOUT_THRESHOLD
+    authors = Follow.objects.filter(
+        user=user, author__followers_count__gte=threshold
+    ).values_list('author_id', flat=True)
+    posts = Post.objects.filter(status='published').select_related('author')
+    for author_id in authors:
+        page = CursorPaginator(posts.filter(author_id=author_id), per_page)
+        page = page.page(cursor)
+        streams.append(page.object_list)
+        has_more = has_more or page.has_next()
+    merged = heapq.merge(
+        *streams, key=lambda post: (post.created, post.id), reverse=True
+    )
+    seen, objs = set(), []
+    for post in merged:
+        if post.id not in seen:
+            seen.add(post.id)
+            objs.append(post)
+    has_more = has_more or len(objs) > per_page
+    objs = objs[:per_page]
+    next_cursor = None
+    if objs and has_more:
+        next_cursor = CursorPaginator(posts, per_page).encode_cursor(objs[-1])
+    return CursorPage(objs, None, next_cursor, None)
+
+
+def render_image(source, target, width=None, quality=95):
+    """Сохранение копии изображения в webp с уменьшением до ширины width.
+
+    Выполняется в пуле процессов, поэтому не обращается к Django.
+    """
+    with Image.open(source) as image:
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert(
+                'RGBA' if 'transparency' in image.info else 'RGB'
+            )
+        if width and image.width > width:
+            image = image.resize(
+                (width, round(image.height * width / image.width)),
+                Image.LANCZOS,
+            )
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        image.save(target, 'webp', quality=quality)
+        return image.size
+
+
+def generate_renditions(image_id):
+    """Создание копий загруженного изображения для всех вариантов."""
+    image = Images.objects.filter(id=image_id).first()
+    if image is None or not image.image:
+        return
+    stem = Path(image.image.name).stem
+    for variant, (width, quality) in RENDITIONS.items():
+        name = f'renditions/{image.id}-{stem}-{variant}.webp'  # type: ignore
+        size = run_in_process(
+            render_image,
+            image.image.path,
+            default_storage.path(name),
+            width,
+            quality,
+        )
+        ImageRendition.objects.update_or_create(
+            image=image,
+            variant=variant,
+            defaults={'file': name, 'width': size[0], 'height': size[1]},
+        )
+
+
+def image_cache_key(image, width):
+    """Ключ копии изображения: меняется вместе с файлом оригинала."""
+    return hashlib.sha1(
+        f'{image.id}:{image.image.name}:{width}'.encode()
+    ).hexdigest()
+
+
+def image_etag(image, width):
+    """Строгий ETag копии изображения заданной ширины."""
+    return f'"{image_cache_key(image, width)}"'
+
+
+def cached_image(image, width):
+    """Путь к копии изображения шириной width в дисковом кэше.
+
+    Копия создаётся при первом запросе. Время изменения файла обновляется
+    при каждом обращении и служит меткой для вытеснения давно не
+    использованных копий.
+    """
+    cache_dir = Path(settings.IMAGE_CACHE_DIR)
+    path = cache_dir / f'{image_cache_key(image, width)}.webp'
+    try:
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        pass
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f'{path.stem}.{uuid.uuid4().hex}.tmp')
+    run_in_process(
+        render_image,
+        image.image.path,
+        str(tmp_path),
+        width,
+        IMAGE_CACHE_QUALITY,
     )
-    return new_obj
+    os.replace(tmp_path, path)
+    evict_image_cache(cache_dir, settings.IMAGE_CACHE_MAX_BYTES, keep=path)
+    return path
+
+
+def evict_image_cache(cache_dir, max_bytes, keep=None):
+    """Удаление давно не использованных копий сверх лимита max_bytes."""
+    files = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith('.webp'):
+            stat = entry.stat()
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        if keep is not None and path == str(keep):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    return total
+
+
+def update_in_chunks(queryset, chunk_size, **values):
+    """Обновление объектов выборки порциями по возрастанию id."""
+    last_id, total = 0, 0
+    while True:
+        chunk = list(
+            queryset.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not chunk:
+            return total
+        with transaction.atomic():
+            total += queryset.model.objects.filter(id__in=chunk).update(
+                **values
+            )
+        last_id = chunk[-1]
+
+
+def resolve_tags(names):
+    """Теги по именам: недостающие создаются одной вставкой.
+
+    Имена, слаг которых совпал с уже занятым, сохраняются по одному,
+    чтобы taggit подобрал свободный слаг. Возвращает {имя: тег}.
+    """
+    names = set(names)
+    tags = {tag.name: tag for tag in Tag.objects.filter(name__in=names)}
+    missing = sorted(names - set(tags))
+    if missing:
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=Tag().slugify(name)) for name in missing],
+            ignore_conflicts=True,
+        )
+        tags.update(
+            (tag.name, tag) for tag in Tag.objects.filter(name__in=missing)
+        )
+        for name in names - set(tags):
+            tags[name] = Tag.objects.get_or_create(name=name)[0]
+    return tags
+
+
+def bulk_add_tags(post_tags, batch_size=1000):
+    """Привязка тегов к постам вставкой TaggedItem пачками.
+
+    post_tags - список пар (пост, имена тегов). Сигнал m2m_changed не
+    отправляется, поэтому списки постов по тегам сбрасываются здесь.
+    """
+    tags = resolve_tags(name for _, names in post_tags for name in names)
+    content_type = ContentType.objects.get_for_model(Post)
+    TaggedItem.objects.bulk_create(
+        [
+            TaggedItem(
+                content_type=content_type, object_id=post.id, tag=tags[name]
+            )
+            for post, names in post_tags
+            for name in set(names)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    bump_versions(
+        list_version_key(),
+        *(list_version_key(tag.slug) for tag in tags.values()),
+    )
+
+
+def sync_tags(post, names):
+    """Приведение тегов поста к набору имён names.
+
+    Новые теги добавляются одной вставкой, снятые удаляются одним
+    запросом, а при неизменном наборе база не меняется. Возвращает
+    True, если теги поста изменились.
+    """
+    content_type = ContentType.objects.get_for_model(Post)
+    items = TaggedItem.objects.filter(
+        content_type=content_type, object_id=post.id
+    )
+    current = {
+        name: (tag_id, slug)
+        for name, tag_id, slug in items.values_list(
+            'tag__name', 'tag_id', 'tag__slug'
+        )
+    }
+    names = set(names)
+    added = names - set(current)
+    removed = [current[name] for name in set(current) - names]
+    if not added and not removed:
+        return False
+    if removed:
+        items.filter(tag_id__in=[tag_id for tag_id, _ in removed]).delete()
+        bump_versions(
+            list_version_key(),
+            *(list_version_key(slug) for _, slug in removed),
+        )
+    if added:
+        bulk_add_tags([(post, added)])
+    SimilarPost.objects.update_for(post.id)
+    bump_post_versions(post.id, 'body')
+    return True
+
+
+def publish_posts(post_ids):
+    """Похожие посты и рассылка по лентам для постов, созданных пачкой."""
+    for post_id in post_ids:
+        SimilarPost.objects.update_for(post_id)
+        Timeline.objects.fan_out(post_id)
+
+
+def published_comments_count():
+    """Подзапрос количества опубликованных комментариев поста."""
+    comments = (
+        Comment.objects.filter(post=OuterRef('id'), status='published')
+        .order_by()
+        .values('post')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(comments), 0)
+
+
+def flush_like_buffer(batch_size=1000):
+    """Запись накопленных в буфере переключений лайков в базу данных.
+
+    Записываются поколения буфера, выведенные из оборота прошлым вызовом,
+    после чего из оборота выводится текущее поколение. Так переключения,
+    начатые до смены поколения, успевают попасть в буфер до записи.
+    Возвращает количество добавленных и удалённых лайков.
+    """
+    cache = buffer_cache()
+    if not cache.add(FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        return 0, 0
+    try:
+        generations = pending_generations(cache)
+        current, retired = generations[0], generations[:0:-1]
+        keys, events = [], set()
+        for generation in retired:
+            numbers = range(1, cache.get(sequence_key(generation), 0) + 1)
+            event_keys = [event_key(generation, n) for n in numbers]
+            events.update(cache.get_many(event_keys).values())
+            keys += event_keys + [sequence_key(generation)]
+        states = {}
+        for generation in retired:
+            state_keys = {
+                state_key(generation, *event): event for event in events
+            }
+            for key, liked in cache.get_many(state_keys).items():
+                states[state_keys[key]] = liked
+            keys += list(state_keys)
+            keys += [
+                delta_key(generation, type_id, object_id)
+                for type_id, object_id, _ in events
+            ]
+        result = apply_like_states(states, batch_size)
+        cache.set(FLUSHED_KEY, current - 1, None)
+        cache.delete_many(keys)
+        cache.set(GENERATION_KEY, current + 1, None)
+        return result
+    finally:
+        cache.delete(FLUSH_LOCK_KEY)
+
+
+def apply_like_states(states, batch_size):
+    """Приведение лайков в базе к желаемым состояниям из буфера.
+
+    states - словарь {(content_type_id, object_id, user_id): лайк стоит}.
+    Лайки добавляются через bulk_create, удаляются пачками по id, а
+    счётчики и топ-лист меняются один раз на объект.
+    """
+    wanted = defaultdict(dict)
+    for (type_id, object_id, user_id), liked in states.items():
+        wanted[type_id][object_id, user_id] = liked
+    inserted, deleted = 0, 0
+    now = timezone.now()
+    with transaction.atomic():
+        for type_id, type_states in wanted.items():
+            likes = Like.objects.filter(
+                content_type_id=type_id,
+                object_id__in={key[0] for key in type_states},
+                user_id__in={key[1] for key in type_states},
+            ).values_list('id', 'object_id', 'user_id', 'created')
+            existing = {
+                (object_id, user_id): (like_id, created)
+                for like_id, object_id, user_id, created in likes
+            }
+            to_create = [
+                key
+                for key, liked in type_states.items()
+                if liked and key not in existing
+            ]
+            to_delete = [
+                (key[0], *existing[key])
+                for key, liked in type_states.items()
+                if not liked and key in existing
+            ]
+            Like.objects.bulk_create(
+                [
+                    Like(
+                        content_type_id=type_id,
+                        object_id=object_id,
+                        user_id=user_id,
+                        created=now,
+                    )
+                    for object_id, user_id in to_create
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+            ids = [like_id for _, like_id, _ in to_delete]
+            with connection.cursor() as cursor:
+                for start in range(0, len(ids), batch_size):
+                    batch = ids[start : start + batch_size]  # noqa: E203
+                    cursor.execute(
+                        f'DELETE FROM {Like._meta.db_table} '
+                        'WHERE id = ANY(%s)',
+                        [batch],
+                    )
+            changes = Counter(object_id for object_id, _ in to_create)
+            changes.subtract(object_id for object_id, _, _ in to_delete)
+            model = ContentType.objects.get_for_id(type_id).model_class()
+            for object_id, delta in changes.items():
+                if delta:
+                    model.objects.filter(id=object_id).update(
+                        likes_count=F('likes_count') + delta
+                    )
+            if model is Post:
+                removed = defaultdict(list)
+                for object_id, _, created in to_delete:
+                    removed[object_id].append(created)
+                added = Counter(object_id for object_id, _ in to_create)
+                for object_id, total in added.items():
+                    TopPost.objects.register_likes(object_id, [now] * total, 1)
+                for object_id, times in removed.items():
+                    TopPost.objects.register_likes(object_id, times, -1)
+                post_ids = set(changes)
+            else:
+                post_ids = set(
+                    Comment.objects.filter(id__in=list(changes)).values_list(
+                        'post_id', flat=True
+                    )
+                )
+            for post_id in post_ids:
+                bump_post_versions(
+                    post_id, 'body' if model is Post else 'comments'
+                )
+            inserted += len(to_create)
+            deleted += len(to_delete)
+    return inserted, deleted
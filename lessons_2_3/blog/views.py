@@ -1,24 +1,66 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Q
-from django.http import HttpResponse
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+)
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import status
 from taggit.models import Tag
+from user.models import User
 
+from .cache import (
+    cached_page,
+    conditional_response,
+    get_post_fragment,
+    get_post_versions,
+    list_version_key,
+    make_etag,
+    version_time,
+)
 from .forms import CommentCreateForm, PostCreateForm
-from .models import Comment, Like, Post
-from .utils import converter, pagination
+from .models import (
+    TOP_PERIODS,
+    Comment,
+    Images,
+    Like,
+    Post,
+    Timeline,
+    TopPost,
+)
+from .tasks import run_on_commit
+from .utils import (
+    aget_object_or_404,
+    alogin_required,
+    assemble_feed,
+    cached_image,
+    image_etag,
+    pagination,
+    sync_tags,
+)
 
 
 def index(request):
-    """Переход на главную страницу."""
+    """Переход на главную страницу.
+
+    Анонимным посетителям страница отдаётся из кэша страниц.
+    """
     if request.user.is_authenticated:
         return redirect('blog:home', request.user.username)
-    posts = Post.objects.filter(status='published')
-    user = request.user
-    posts, page = pagination(request, posts, 3)
-    context = {'posts': posts, 'page': page, 'user': user}
-    return render(request, 'index.html', context)
+
+    def build():
+        posts = Post.objects.filter(status='published')
+        posts, page = pagination(request, posts, 3)
+        context = {'posts': posts, 'page': page, 'user': request.user}
+        return render(request, 'index.html', context)
+
+    return cached_page(request, 'index', [list_version_key()], build)
 
 
 @login_required(login_url='login')
@@ -38,28 +80,74 @@ def UserPostListView(request, username):
     return render(request, 'home.html', context)
 
 
+@login_required(login_url='login')
+def FeedView(request):
+    """Лента постов авторов, на которых подписан пользователь."""
+    page = request.GET.get('page')
+    posts = assemble_feed(request.user, page, 10)
+    context = {'posts': posts, 'page': page, 'user': request.user}
+    return render(request, 'home.html', context)
+
+
 def PostTagListView(request, tag):
     """Выборка постов по определенному тегу."""
-    tag = get_object_or_404(Tag, slug=tag)
-    posts = Post.objects.filter(status='published', tags__in=[tag])
-    posts, page = pagination(request, posts, 3)
-    context = {'posts': posts, 'page': page, 'tag': tag}
-    return render(request, 'home.html', context)
+
+    def build():
+        tag_obj = get_object_or_404(Tag, slug=tag)
+        posts = Post.objects.filter(status='published', tags__in=[tag_obj])
+        posts, page = pagination(request, posts, 3)
+        context = {'posts': posts, 'page': page, 'tag': tag_obj}
+        return render(request, 'home.html', context)
+
+    return cached_page(request, f'tag:{tag}', [list_version_key(tag)], build)
 
 
 def PostDetailView(request, pk):
-    """Представление отдельного поста с комментариями."""
-    post = get_object_or_404(Post, id=pk)
-    images = [converter(image.image) for image in post.images.all()]  # type: ignore # noqa: E501
-    comments = post.post_comments.filter(status='published')  # type: ignore # noqa: E501
-    form = CommentCreateForm()
-    context = {
-        'post': post,
-        'images': images,
-        'form': form,
-        'comments': comments,
-    }
-    return render(request, 'post/post_detail.html', context)
+    """Представление отдельного поста с комментариями.
+
+    Пост с изображениями и список комментариев кэшируются отдельно по
+    версиям, которые сбрасывают сигналы при изменении данных. Эти же
+    версии дают ETag и Last-Modified: неизменённая страница отдаётся
+    ответом 304 без обращения к базе.
+    """
+    versions = get_post_versions(pk)
+
+    def build_body():
+        post = get_object_or_404(
+            Post.objects.select_related('author').prefetch_related('tags'),
+            id=pk,
+        )
+        images = list(post.images.prefetch_related('renditions'))  # type: ignore # noqa: E501
+        return post, images
+
+    def build_comments():
+        return list(
+            Comment.objects.filter(
+                post_id=pk, status='published'
+            ).select_related('author')
+        )
+
+    def build():
+        post, images = get_post_fragment(
+            pk, 'body', versions['body'], build_body
+        )
+        comments = get_post_fragment(
+            pk, 'comments', versions['comments'], build_comments
+        )
+        form = CommentCreateForm()
+        context = {
+            'post': post,
+            'images': images,
+            'form': form,
+            'comments': comments,
+        }
+        return render(request, 'post/post_detail.html', context)
+
+    etag = make_etag(
+        'post', pk, versions['body'], versions['comments'], request.user.id
+    )
+    last_modified = max(map(version_time, versions.values()))
+    return conditional_response(request, etag, last_modified, build)
 
 
 @login_required(login_url='login')
@@ -71,7 +159,8 @@ def PostCreateView(request):
             obj = form.save(commit=False)
             obj.author = request.user
             obj.save()
-            form.save_m2m()
+            sync_tags(obj, form.cleaned_data['tags'])
+            run_on_commit(Timeline.objects.fan_out, obj.id)
             return redirect('blog:home', request.user.username)
     form = PostCreateForm()
     return render(request, 'post/post_create.html', {'form': form})
@@ -84,7 +173,9 @@ def PostUpdateView(request, pk):
     if request.method == 'POST' and request.user == post.author:
         form = PostCreateForm(data=request.POST, instance=post)
         if form.is_valid():
-            form.save()
+            post = form.save(commit=False)
+            post.save()
+            sync_tags(post, form.cleaned_data['tags'])
             return redirect('blog:post_detail', post.id)  # type: ignore # noqa: E501
     form = PostCreateForm(instance=post)
     return render(
@@ -145,21 +236,41 @@ def CommentDeleteView(request, pk):
 
 @login_required(login_url='login')
 def SearchPostView(request):
-    """Производит поиск постов по ключевому слову."""
-    search = request.POST['search']
-    posts_list = Post.objects.filter(
-        Q(text__icontains=search)
-        | Q(title__icontains=search)
-        | Q(author__username__icontains=search),
-        status='published',
+    """Производит полнотекстовый поиск постов по ключевому слову.
+
+    Результаты ранжируются по весу совпадений (заголовок важнее текста)
+    и содержат фрагмент текста с подсвеченными совпадениями.
+    """
+    search = request.POST.get('search', request.GET.get('search', ''))
+    query = SearchQuery(search, config='russian', search_type='websearch')
+    authors = User.objects.filter(username__iexact=search)
+    posts_list = (
+        Post.objects.filter(
+            Q(search_vector=query) | Q(author__in=authors),
+            status='published',
+        )
+        .select_related('author')
+        .annotate(
+            rank=SearchRank(F('search_vector'), query),
+            snippet=SearchHeadline(
+                'text',
+                query,
+                config='russian',
+                start_sel='<mark>',
+                stop_sel='</mark>',
+            ),
+        )
+        .order_by('-rank', '-created', '-id')
     )
-    return render(request, 'post/search_post.html', {'posts': posts_list})
+    posts = Paginator(posts_list, 10).get_page(request.GET.get('page'))
+    context = {'posts': posts, 'search': search}
+    return render(request, 'post/search_post.html', context)
 
 
 def likes(user, obj):
     """Создание/удаление лайка к посту или комментарию."""
-    created = Like.likemanager.create_or_delete(user=user, obj=obj)
-    if created:
+    liked, _ = Like.likemanager.create_or_delete(user=user, obj=obj)
+    if liked:
         return HttpResponse(status=status.HTTP_201_CREATED)
     return HttpResponse(status=status.HTTP_204_NO_CONTENT)
 
@@ -178,9 +289,56 @@ def LikeCommentView(request, pk):
     return likes(request.user, obj)
 
 
+async def alikes(user, obj):
+    """Асинхронное создание/удаление лайка к посту или комментарию.
+
+    Переключение - один SQL-запрос с CTE, который выполняется в потоке
+    для синхронного кода.
+    """
+    liked, _ = await sync_to_async(Like.likemanager.create_or_delete)(
+        user=user, obj=obj
+    )
+    if liked:
+        return HttpResponse(status=status.HTTP_201_CREATED)
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+@alogin_required(login_url='login')
+async def LikePostAsyncView(request, pk):
+    """Лайки постов для ASGI."""
+    obj = await aget_object_or_404(Post, id=pk)
+    return await alikes(request.user, obj)
+
+
+@alogin_required(login_url='login')
+async def LikeCommentAsyncView(request, pk):
+    """Лайки комментариев для ASGI."""
+    obj = await aget_object_or_404(Comment, id=pk)
+    return await alikes(request.user, obj)
+
+
 @login_required(login_url='login')
 def TopPostsView(request):
-    """Топ-лист постов."""
-    top = Post.objects.annotate(top=Count('likes')).order_by('-top')
-    context = {'top': top}
+    """Топ-лист постов за период: all, week или day."""
+    period = request.GET.get('period', 'all')
+    if period not in dict(TOP_PERIODS):
+        period = 'all'
+    top = TopPost.objects.top(period)
+    context = {'top': top, 'period': period}
     return render(request, 'index.html', context)
+
+
+def ImageView(request, pk, width):
+    """Копия изображения заданной ширины из дискового кэша."""
+    if width not in settings.IMAGE_WIDTHS:
+        raise Http404
+    image = get_object_or_404(Images, id=pk)
+    etag = image_etag(image, width)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(
+            open(cached_image(image, width), 'rb'), content_type='image/webp'
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=86400)
+    return response
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.sites',
     'django.contrib.sitemaps',
+    'django.contrib.postgres',
     'blog.apps.BlogConfig',
     'user.apps.UserConfig',
     'api.apps.ApiConfig',
@@ -104,6 +105,64 @@ STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Копии изображений по запросу: допустимые ширины и дисковый кэш
+IMAGE_WIDTHS = (320, 640, 1280)
+IMAGE_CACHE_DIR = MEDIA_ROOT / 'cache'
+IMAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Кэш должен быть общим для всех процессов сервера и команд manage.py:
+# через него сбрасываются фрагменты и страницы (версии в blog.cache) и ETag
+# условных запросов, в нём лежат блокировки перестроения страниц и буфер
+# лайков. Локальный кэш процесса (LocMemCache) для этого не подходит.
+# В продакшене - Redis из REDIS_URL. Redis нужно запускать с
+# maxmemory-policy volatile-lru, чтобы не вытеснялись ключи без срока
+# жизни: версии и буфер лайков. Без REDIS_URL, для разработки, -
+# файловый кэш в CACHE_DIR, общий для процессов одной машины.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', BASE_DIR / '.cache'),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Время жизни фрагментов страницы поста, секунды
+POST_CACHE_TIMEOUT = 60 * 60
+
+# Кэш страниц для анонимных посетителей: время свежести ответа, время, в
+# течение которого отдаётся устаревший ответ, блокировка его обновления и
+# время ожидания ответа, который строит другой запрос, если ответа в кэше нет
+PAGE_CACHE_TIMEOUT = 60
+PAGE_CACHE_STALE_TIMEOUT = 10 * 60
+PAGE_CACHE_LOCK_TIMEOUT = 30
+PAGE_CACHE_WAIT_TIMEOUT = 5
+
+# Буфер лайков: переключения копятся в кэше LIKE_BUFFER_CACHE и пишутся в
+# базу командой flush_likes. Кэш должен быть общим для всех процессов и
+# атомарно выполнять incr (Redis): файловый кэш годится только для разработки.
+LIKE_BUFFER = False
+LIKE_BUFFER_CACHE = 'default'
+
+# Посты авторов с таким числом подписчиков не рассылаются по лентам при
+# публикации, а подмешиваются в ленту при чтении
+FEED_FANOUT_THRESHOLD = 10000
+
+# Асинхронные представления лайков, подписок и рейтинга: включать при
+# запуске через ASGI (lessons_2_3.asgi)
+ASYNC_VIEWS = False
+
+# Фоновые задачи: 0 - выполнять сразу в текущем потоке
+BACKGROUND_THREADS = 4
+BACKGROUND_PROCESSES = 2
+
 AUTH_USER_MODEL = 'user.User'
 
 LOGIN_REDIRECT_URL = 'blog:index'
@@ -122,9 +181,30 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
 
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 10,
+
     'TEST_REQUEST_DEFAULT_FORMAT': 'json'
 }
 
+# Наибольший размер страницы API, который можно запросить через page_size
+API_MAX_PAGE_SIZE = 100
+
+# Количество постов, читаемых из серверного курсора за раз при выгрузке
+EXPORT_CHUNK_SIZE = 500
+
+# Создание постов списком: наибольшая длина списка и размер пачки вставки
+API_BULK_MAX_POSTS = 10000
+API_BULK_BATCH_SIZE = 1000
+
+# Чтение списков и объектов API через .values() без сериалайзеров
+API_ROW_MAPPERS = True
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=50),
     'AUTH_HEADER_TYPES': ('Bearer',),
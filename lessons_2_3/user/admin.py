@@ -13,6 +13,8 @@ class AdminUser(admin.ModelAdmin):
         'created',
         'updated',
         'is_active',
+        'rating_count',
     )
+    readonly_fields = ('followers_count', 'rating_count')
     list_filter = ('created', 'updated', 'is_active')
     search_fields = ('email', 'username', 'first_name', 'last_name')
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from user.models import TOP_AUTHOR_PERIOD_LENGTHS, Rating, TopAuthor, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает топ-лист авторов за скользящие периоды, '
+        'исключая устаревшие оценки. Предназначена для периодического запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать также рейтинг за всё время.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for period, length in TOP_AUTHOR_PERIOD_LENGTHS.items():
+            scores = (
+                Rating.objects.filter(created_at__gte=now - length)
+                .order_by()
+                .values('profile')
+                .annotate(total=Count('id'))
+                .values_list('profile', 'total')
+            )
+            self.replace(period, scores)
+        if options['all']:
+            ratings = (
+                Rating.objects.filter(profile=OuterRef('id'))
+                .order_by()
+                .values('profile')
+                .annotate(total=Count('id'))
+                .values('total')
+            )
+            User.objects.update(rating_count=Coalesce(Subquery(ratings), 0))
+            scores = User.objects.filter(rating_count__gt=0).values_list(
+                'id', 'rating_count'
+            )
+            self.replace('all', scores)
+
+    def replace(self, period, scores):
+        """Замена рейтинга периода новыми значениями."""
+        with transaction.atomic():
+            TopAuthor.objects.filter(period=period).delete()
+            rows = TopAuthor.objects.bulk_create(
+                TopAuthor(user_id=user_id, period=period, rating=rating)
+                for user_id, rating in scores.iterator()
+            )
+        self.stdout.write(f'{period}: {len(rows)}')
@@ -0,0 +1,36 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_followers_count(apps, schema_editor):
+    Follow = apps.get_model("user", "Follow")
+    User = apps.get_model("user", "User")
+    followers = (
+        Follow.objects.filter(author=OuterRef("id"))
+        .order_by()
+        .values("author")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    User.objects.update(followers_count=Coalesce(Subquery(followers), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0003_alter_user_is_active"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="followers_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Количество подписчиков"
+            ),
+        ),
+        migrations.RunPython(fill_followers_count, migrations.RunPython.noop),
+    ]
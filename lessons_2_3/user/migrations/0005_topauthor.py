@@ -0,0 +1,127 @@
+# Generated by Django 4.1.2 on 2026-10-18 06:20
+
+import datetime
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def fill_ratings(apps, schema_editor):
+    Rating = apps.get_model("user", "Rating")
+    User = apps.get_model("user", "User")
+    TopAuthor = apps.get_model("user", "TopAuthor")
+    ratings = (
+        Rating.objects.filter(profile=OuterRef("id"))
+        .order_by()
+        .values("profile")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    User.objects.update(rating_count=Coalesce(Subquery(ratings), 0))
+    TopAuthor.objects.bulk_create(
+        TopAuthor(user_id=user_id, period="all", rating=rating)
+        for user_id, rating in User.objects.filter(rating_count__gt=0)
+        .values_list("id", "rating_count")
+        .iterator()
+    )
+    now = timezone.now()
+    for period, days in (("month", 30), ("week", 7)):
+        TopAuthor.objects.bulk_create(
+            TopAuthor(user_id=user_id, period=period, rating=rating)
+            for user_id, rating in Rating.objects.filter(
+                created_at__gte=now - datetime.timedelta(days=days)
+            )
+            .order_by()
+            .values("profile")
+            .annotate(total=Count("id"))
+            .values_list("profile", "total")
+            .iterator()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0004_user_followers_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Рейтинг"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="rating",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Дата оценки"
+            ),
+        ),
+        migrations.CreateModel(
+            name="TopAuthor",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[
+                            ("all", "За всё время"),
+                            ("month", "За месяц"),
+                            ("week", "За неделю"),
+                        ],
+                        max_length=10,
+                        verbose_name="Период",
+                    ),
+                ),
+                (
+                    "rating",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Рейтинг"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="top_scores",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Топ автора",
+                "verbose_name_plural": "Топ авторов",
+                "ordering": ("period", "-rating"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="topauthor",
+            index=models.Index(
+                fields=["period", "-rating", "-user"],
+                name="top_author_period_rating_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="topauthor",
+            constraint=models.UniqueConstraint(
+                fields=("user", "period"), name="unique_user_period"
+            ),
+        ),
+        migrations.RunPython(fill_ratings, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,24 @@
 import uuid
+from datetime import timedelta
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractUser, UserManager
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
 from django.urls import reverse
+from django.utils import timezone
+
+TOP_AUTHOR_PERIODS = (
+    ('all', 'За всё время'),
+    ('month', 'За месяц'),
+    ('week', 'За неделю'),
+)
+TOP_AUTHOR_PERIOD_LENGTHS = {
+    'month': timedelta(days=30),
+    'week': timedelta(days=7),
+}
+TOP_AUTHORS_LIMIT = 10
 
 
 class User(AbstractUser):
@@ -23,6 +39,12 @@ class User(AbstractUser):
     verification_uuid = models.UUIDField(
         default=uuid.uuid4, verbose_name='Код подтверждения'
     )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество подписчиков'
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, verbose_name='Рейтинг'
+    )
     objects = UserManager()
 
     class Meta:
@@ -38,6 +60,53 @@ class User(AbstractUser):
         return f'{self.username}: {self.email}'
 
 
+class FollowManager(models.Manager):
+    def toggle(self, author, user):
+        """Подписывает пользователя на автора или снимает подписку.
+
+        Переключение и обновление счётчика подписчиков автора на
+        фактическое число удалённых и вставленных строк выполняются одним
+        запросом, поэтому параллельные переключения не сбивают счётчик.
+        Возвращает кортеж (подписка создана, новое число подписчиков).
+        """
+        follow_table = self.model._meta.db_table
+        user_table = User._meta.db_table
+        key = [user.id, author.id]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH deleted AS (
+                    DELETE FROM {follow_table}
+                    WHERE user_id = %s AND author_id = %s
+                    RETURNING id
+                ), inserted AS (
+                    INSERT INTO {follow_table}
+                        (user_id, author_id, created_at)
+                    SELECT %s, %s, %s
+                    WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                    ON CONFLICT (user_id, author_id) DO NOTHING
+                    RETURNING id
+                ), counter AS (
+                    UPDATE {user_table}
+                    SET followers_count = followers_count
+                        + (SELECT count(*) FROM inserted)
+                        - (SELECT count(*) FROM deleted)
+                    WHERE id = %s
+                    RETURNING followers_count
+                )
+                SELECT
+                    NOT EXISTS (SELECT 1 FROM deleted),
+                    (SELECT followers_count FROM counter)
+                """,
+                key + key + [timezone.now(), author.id],
+            )
+            return cursor.fetchone()
+
+    async def atoggle(self, author, user):
+        """Асинхронный вариант toggle()."""
+        return await sync_to_async(self.toggle)(author, user)
+
+
 class Follow(models.Model):
     user = models.ForeignKey(
         User,
@@ -65,10 +134,60 @@ class Follow(models.Model):
             )
         ]
 
+    objects = FollowManager()
+
     def __str__(self):
         return f'{self.user} -> {self.author}'
 
 
+class RatingManager(models.Manager):
+    def toggle(self, profile, valuer):
+        """Ставит оценку профилю или снимает уже поставленную.
+
+        Переключение и обновление рейтинга профиля выполняются одним
+        запросом. Возвращает кортеж (оценка поставлена, новый рейтинг).
+        """
+        rating_table = self.model._meta.db_table
+        user_table = User._meta.db_table
+        key = [profile.id, valuer.id]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH deleted AS (
+                    DELETE FROM {rating_table}
+                    WHERE profile_id = %s AND valuer_id = %s
+                    RETURNING created_at
+                ), inserted AS (
+                    INSERT INTO {rating_table}
+                        (profile_id, valuer_id, created_at)
+                    SELECT %s, %s, %s
+                    WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                    ON CONFLICT (profile_id, valuer_id) DO NOTHING
+                    RETURNING created_at
+                ), counter AS (
+                    UPDATE {user_table}
+                    SET rating_count = rating_count
+                        + (SELECT count(*) FROM inserted)
+                        - (SELECT count(*) FROM deleted)
+                    WHERE id = %s
+                    RETURNING rating_count
+                )
+                SELECT
+                    NOT EXISTS (SELECT 1 FROM deleted),
+                    (SELECT rating_count FROM counter),
+                    (SELECT created_at FROM deleted),
+                    (SELECT created_at FROM inserted)
+                """,
+                key + key + [timezone.now(), profile.id],
+            )
+            rated, rating, deleted, inserted = cursor.fetchone()
+            if deleted or inserted:
+                TopAuthor.objects.register_ratings(
+                    profile.id, [deleted or inserted], -1 if deleted else 1
+                )
+        return rated, rating
+
+
 class Rating(models.Model):
     profile = models.ForeignKey(
         User,
@@ -83,8 +202,9 @@ class Rating(models.Model):
         verbose_name='Оценщик',
     )
     created_at = models.DateTimeField(
-        auto_now=True, verbose_name='Дата оценки'
+        auto_now=True, db_index=True, verbose_name='Дата оценки'
     )
+    objects = RatingManager()
 
     class Meta:
         ordering = ('-created_at',)
@@ -98,3 +218,102 @@ class Rating(models.Model):
 
     def __str__(self):
         return f'{self.profile}'
+
+
+class TopAuthorManager(models.Manager):
+    def register_ratings(self, user_id, times, sign):
+        """Учитывает поставленные (sign=1) или снятые (sign=-1) оценки.
+
+        times - даты оценок: оценка меняет счёт только тех периодов,
+        в которые она попадает.
+        """
+        now = timezone.now()
+        deltas = {}
+        for period, _ in TOP_AUTHOR_PERIODS:
+            length = TOP_AUTHOR_PERIOD_LENGTHS.get(period)
+            total = sum(
+                1 for time in times if length is None or time >= now - length
+            )
+            if total:
+                deltas[period] = sign * total
+        if sign < 0:
+            for period, delta in deltas.items():
+                self.filter(user_id=user_id, period=period).update(
+                    rating=Greatest(F('rating') + delta, 0)
+                )
+        elif deltas:
+            table = connection.ops.quote_name(self.model._meta.db_table)
+            values = ', '.join(['(%s, %s, %s)'] * len(deltas))
+            params = [
+                value
+                for period, delta in deltas.items()
+                for value in (user_id, period, delta)
+            ]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, period, rating) '
+                    f'VALUES {values} '
+                    'ON CONFLICT (user_id, period) '
+                    f'DO UPDATE SET rating = {table}.rating + EXCLUDED.rating',
+                    params,
+                )
+
+    def top(self, period='all', limit=TOP_AUTHORS_LIMIT):
+        """Авторы с наибольшим рейтингом за период."""
+        return (
+            User.objects.filter(
+                top_scores__period=period, top_scores__rating__gt=0
+            )
+            .annotate(top_rating=F('top_scores__rating'))
+            .order_by('-top_rating', '-id')[:limit]
+        )
+
+    def rank(self, user_id, period='all'):
+        """Место автора в топ-листе периода и его рейтинг.
+
+        None, если у автора нет оценок за период.
+        """
+        score = (
+            self.filter(user_id=user_id, period=period, rating__gt=0)
+            .values_list('rating', flat=True)
+            .first()
+        )
+        if score is None:
+            return None
+        above = self.filter(period=period).filter(
+            Q(rating__gt=score) | Q(rating=score, user_id__gt=user_id)
+        )
+        return above.count() + 1, score
+
+
+class TopAuthor(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='top_scores',
+        verbose_name='Автор',
+    )
+    period = models.CharField(
+        max_length=10, choices=TOP_AUTHOR_PERIODS, verbose_name='Период'
+    )
+    rating = models.PositiveIntegerField(default=0, verbose_name='Рейтинг')
+    objects = TopAuthorManager()
+
+    class Meta:
+        ordering = ('period', '-rating')
+        verbose_name = 'Топ автора'
+        verbose_name_plural = 'Топ авторов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'period'], name='unique_user_period'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('period', '-rating', '-user'),
+                name='top_author_period_rating_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.rating}'
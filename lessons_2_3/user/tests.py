@@ -1,14 +1,18 @@
 from datetime import datetime
+from io import StringIO
 
 from django.contrib.auth.forms import AuthenticationForm
 from django.core import mail
+from django.core.management import call_command
 from django.db.models import Count
-from django.test import Client, TestCase
+from django.http import Http404
+from django.test import AsyncRequestFactory, Client, TestCase
 from django.urls import reverse
 from rest_framework import status
 
 from .forms import UserCreateUpdateForm, RecoveryForm
-from .models import Rating, User
+from .models import Follow, Rating, TopAuthor, User
+from .views import FollowAsyncView, RatingAsyncView
 
 
 class TestUser(TestCase):
@@ -235,6 +239,16 @@ class TestFollow(TestCase):
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(self.o.followers.count(), followers)
+        self.o.refresh_from_db()
+        self.assertEqual(self.o.followers_count, followers)
+
+    def test_follow_toggle(self):
+        """Счётчик подписчиков меняется на число изменённых строк."""
+        self.assertEqual(Follow.objects.toggle(self.o, self.u), (True, 1))
+        self.assertEqual(Follow.objects.toggle(self.o, self.s), (True, 2))
+        self.assertEqual(Follow.objects.toggle(self.o, self.u), (False, 1))
+        self.assertEqual(Follow.objects.toggle(self.o, self.s), (False, 0))
+        self.assertFalse(self.o.followers.exists())
 
     def test_rating(self):
         """Тест системы оценки профиля."""
@@ -243,9 +257,36 @@ class TestFollow(TestCase):
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(self.o.rating.count(), rating + 1)
+        self.o.refresh_from_db()
+        self.assertEqual(self.o.rating_count, rating + 1)
+        self.assertEqual(TopAuthor.objects.rank(self.o.id, 'week'), (1, 1))
         response = self.user.get(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(self.o.rating.count(), rating)
+        self.o.refresh_from_db()
+        self.assertEqual(self.o.rating_count, rating)
+        self.assertIsNone(TopAuthor.objects.rank(self.o.id, 'week'))
+
+    async def test_follow_rating_async(self):
+        """Асинхронные представления подписки и оценки профиля."""
+        request = AsyncRequestFactory().get('/')
+        request.user = self.u
+        response = await FollowAsyncView(request, pk=self.o.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        author = await User.objects.aget(id=self.o.id)
+        self.assertEqual(author.followers_count, self.o.followers_count + 1)
+        response = await FollowAsyncView(request, pk=self.o.id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(await self.o.followers.aexists())
+        author = await User.objects.aget(id=self.o.id)
+        self.assertEqual(author.followers_count, self.o.followers_count)
+        response = await RatingAsyncView(request, pk=self.o.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await self.o.rating.aexists())
+        response = await RatingAsyncView(request, pk=self.o.id)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        with self.assertRaises(Http404):
+            await RatingAsyncView(request, pk=0)
 
     def test_top_authors(self):
         """Тест запроса самых популярных авторов."""
@@ -257,14 +298,22 @@ class TestFollow(TestCase):
                 Rating(profile=self.s, valuer=self.o),
             ]
         )
+        call_command('refresh_top_authors', all=True, stdout=StringIO())
         url = reverse('user:top_authors')
-        top = User.objects.annotate(top_rating=Count('rating')).order_by(
-            '-top_rating'
+        top = sorted(
+            User.objects.annotate(top_rating=Count('rating')).filter(
+                top_rating__gt=0
+            ),
+            key=lambda user: (-user.top_rating, -user.id),
         )
-        response = self.user.get(url)
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTemplateUsed(response, 'top_rating.html')
-        self.assertTrue(response.context['top'])
-        self.assertQuerysetEqual(
-            response.context['top'], top, transform=lambda x: x
+        with self.assertNumQueries(5):
+            response = self.user.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTemplateUsed(response, 'top_rating.html')
+            self.assertEqual(list(response.context['top']), top)
+        self.assertEqual(response.context['rank'], (1, 2))
+        self.assertEqual(
+            [user.top_rating for user in response.context['top']], [2, 1, 1]
         )
+        response = self.other.get(url, {'period': 'week'})
+        self.assertEqual(response.context['rank'], (top.index(self.o) + 1, 1))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
@@ -19,7 +20,15 @@ urlpatterns = [
     ),
     path('recovery/', views.RecoveryView, name='recovery'),
     path('activate/<uuid:uuid>/', views.activate, name='activate'),
-    path('follow/<int:pk>/', views.FollowView, name='follow'),
-    path('like/<int:pk>/', views.RatingView, name='rating'),
+    path(
+        'follow/<int:pk>/',
+        views.FollowAsyncView if settings.ASYNC_VIEWS else views.FollowView,
+        name='follow',
+    ),
+    path(
+        'like/<int:pk>/',
+        views.RatingAsyncView if settings.ASYNC_VIEWS else views.RatingView,
+        name='rating',
+    ),
     path('top/', views.TopAuthorsView, name='top_authors'),
 ]
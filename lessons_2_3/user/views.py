@@ -1,11 +1,14 @@
+from asgiref.sync import sync_to_async
+from blog.models import Timeline
+from blog.tasks import run_on_commit
+from blog.utils import aget_object_or_404, alogin_required
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from rest_framework import status
 
 from .forms import RecoveryForm, UserCreateUpdateForm
-from .models import Follow, Rating, User
+from .models import TOP_AUTHOR_PERIODS, Follow, Rating, TopAuthor, User
 from .utils import send_message
 
 
@@ -82,12 +85,11 @@ def ReadProfileView(request, username):
 def FollowView(request, pk):
     """Создание/удаление подписки."""
     author = get_object_or_404(User, id=pk)
-    follow, created = Follow.objects.get_or_create(
-        user=request.user, author=author
-    )
-    if created:
+    followed, _ = Follow.objects.toggle(author, request.user)
+    if followed:
+        run_on_commit(Timeline.objects.follow, request.user.id, author.id)
         return HttpResponse(status=status.HTTP_201_CREATED)
-    follow.delete()
+    run_on_commit(Timeline.objects.unfollow, request.user.id, author.id)
     return HttpResponse(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -95,20 +97,49 @@ def FollowView(request, pk):
 def RatingView(request, pk):
     """Создание/удаление лфйка автору."""
     profile = get_object_or_404(User, id=pk)
-    like, created = Rating.objects.get_or_create(
-        profile=profile, valuer=request.user
+    rated, _ = Rating.objects.toggle(profile, request.user)
+    if rated:
+        return HttpResponse(status=status.HTTP_201_CREATED)
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+@alogin_required(login_url='login')
+async def FollowAsyncView(request, pk):
+    """Создание/удаление подписки для ASGI."""
+    author = await aget_object_or_404(User, id=pk)
+    followed, _ = await Follow.objects.atoggle(author, request.user)
+    if followed:
+        await sync_to_async(run_on_commit)(
+            Timeline.objects.follow, request.user.id, author.id
+        )
+        return HttpResponse(status=status.HTTP_201_CREATED)
+    await sync_to_async(run_on_commit)(
+        Timeline.objects.unfollow, request.user.id, author.id
     )
-    if created:
+    return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+
+@alogin_required(login_url='login')
+async def RatingAsyncView(request, pk):
+    """Создание/удаление лайка автору для ASGI."""
+    profile = await aget_object_or_404(User, id=pk)
+    rated, _ = await sync_to_async(Rating.objects.toggle)(
+        profile, request.user
+    )
+    if rated:
         return HttpResponse(status=status.HTTP_201_CREATED)
-    like.delete()
     return HttpResponse(status=status.HTTP_204_NO_CONTENT)
 
 
 @login_required(login_url='login')
 def TopAuthorsView(request):
-    """Ввозвращает топ-лист авторов."""
-    top = User.objects.annotate(top_rating=Count('rating')).order_by(
-        '-top_rating'
-    )
-    context = {'top': top}
+    """Ввозвращает топ-лист авторов за период: all, month или week."""
+    period = request.GET.get('period', 'all')
+    if period not in dict(TOP_AUTHOR_PERIODS):
+        period = 'all'
+    context = {
+        'top': TopAuthor.objects.top(period),
+        'period': period,
+        'rank': TopAuthor.objects.rank(request.user.id, period),
+    }
     return render(request, 'top_rating.html', context)